@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+
+import waits
+import metrics
+import selector_registry
+
+ACTION_MODE = os.environ.get('SWIGGY_ACTION_MODE', 'script')
+POLL_MS = 100
+STABLE_FRAMES = 2
+VERIFY_TIMEOUT = 2
+
+CLICK_SCRIPT = selector_registry.LOCATE_JS + """
+var timeoutMs = arguments[0];
+var pollMs = arguments[1];
+var candidates = arguments[2];
+var stableFrames = arguments[3];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+
+function finish(result) {
+    result.elapsed_ms = Date.now() - started;
+    done(result);
+}
+
+function whenStable(element, callback) {
+    var last = null;
+    var frames = 0;
+    (function check() {
+        var rect = element.getBoundingClientRect();
+        var position = rect.top + ',' + rect.left;
+        if (position === last) {
+            frames++;
+        } else {
+            frames = 0;
+            last = position;
+        }
+        if (frames >= stableFrames || Date.now() - started >= timeoutMs) {
+            callback();
+        } else {
+            setTimeout(check, 16);
+        }
+    })();
+}
+
+function clickWhenStable(found) {
+    var element = found[1];
+    element.scrollIntoView({block: 'center'});
+    whenStable(element, function() {
+        var rect = element.getBoundingClientRect();
+        var hit = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+        var result = {
+            found: true,
+            candidate: found[0],
+            intercepted: !!hit && hit !== element && !element.contains(hit) && !hit.contains(element),
+            verified: null
+        };
+        element.click();
+        // Report in the same task as the click: a navigation it starts only unloads the page after this.
+        finish(result);
+    });
+}
+
+(function poll() {
+    var found = firstShown(candidates);
+    if (found) {
+        return clickWhenStable(found);
+    }
+    if (Date.now() - started >= timeoutMs) {
+        return finish({found: false});
+    }
+    setTimeout(poll, pollMs);
+})();
+"""
+
+VERIFY_SCRIPT = selector_registry.LOCATE_JS + """
+var verifyMs = arguments[0];
+var pollMs = arguments[1];
+var verify = arguments[2];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+
+(function poll() {
+    if (firstShown(verify)) {
+        return done(true);
+    }
+    if (Date.now() - started >= verifyMs) {
+        return done(false);
+    }
+    setTimeout(poll, pollMs);
+})();
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _webdriver_click(driver, name, timeout, label, verify, verify_timeout, required, params):
+    started = time.monotonic()
+    element = selector_registry.wait(driver, name, EC.element_to_be_clickable, timeout, required, **params)
+    driver.execute_script("arguments[0].scrollIntoView(true);", element)
+    waits.settle_after_scroll(driver, element)
+    result = {'found': True, 'intercepted': False, 'verified': None}
+    try:
+        element.click()
+    except Exception as e:
+        logger.warning(f"Normal click on '{name}' failed: {e}. Trying JavaScript click.")
+        metrics.record_fallback(label)
+        driver.execute_script("arguments[0].click();", element)
+        result['intercepted'] = True
+    if verify:
+        try:
+            selector_registry.wait(driver, verify, EC.visibility_of_element_located, verify_timeout, required=False)
+            result['verified'] = True
+        except TimeoutException:
+            result['verified'] = False
+    result['elapsed_ms'] = (time.monotonic() - started) * 1000
+    return result
+
+
+def _run_until_loaded(driver, timeout, script, *args):
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining_ms = max(int((deadline - time.monotonic()) * 1000), 0)
+        try:
+            return driver.execute_async_script(script, remaining_ms, POLL_MS, *args)
+        except JavascriptException as e:
+            # A click navigated away while this script was still polling.
+            if 'unloaded' not in str(e) or time.monotonic() >= deadline:
+                raise
+            logger.debug("Page changed while waiting for an element. Waiting on the new page.")
+
+
+def _run_click_script(driver, timeout, locators):
+    # The click script reports back in the same task as its click, so an unloaded page always means
+    # nothing was clicked yet and running the script again cannot click twice.
+    return _run_until_loaded(driver, timeout, CLICK_SCRIPT, locators, STABLE_FRAMES)
+
+
+def _verify_click(driver, verify_locators, verify_timeout):
+    try:
+        return _run_until_loaded(driver, verify_timeout, VERIFY_SCRIPT, verify_locators)
+    except JavascriptException as e:
+        # The click already happened, so never let a failed check make the caller click again.
+        logger.warning(f"Could not check the result of the click: {e}")
+        return False
+
+
+def click(driver, name, timeout, label=None, verify=None, verify_timeout=VERIFY_TIMEOUT, required=True, **params):
+    label = label or name
+    if ACTION_MODE == 'webdriver':
+        result = _webdriver_click(driver, name, timeout, label, verify, verify_timeout, required, params)
+    else:
+        timeout = selector_registry.effective_timeout(name, timeout, required)
+        order, locators = selector_registry.candidates(name, **params)
+        result = _run_click_script(driver, timeout, locators)
+        if not result['found']:
+            if required:
+                selector_registry.record_match(name, order, None, result['elapsed_ms'] / 1000)
+                metrics.record_failure(name)
+            raise TimeoutException(f"No candidate of selector '{name}' was shown within {timeout}s.")
+        selector_registry.record_match(name, order, result['candidate'], result['elapsed_ms'] / 1000)
+        if result['intercepted']:
+            logger.warning(f"Another element covered '{name}'. Clicked it with JavaScript.")
+            metrics.record_fallback(label)
+        if verify:
+            result['verified'] = _verify_click(driver, selector_registry.candidates(verify)[1], verify_timeout)
+    if result['verified'] is False:
+        logger.warning(f"Clicked '{name}' but '{verify}' did not appear within {verify_timeout}s.")
+    return result
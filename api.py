@@ -1,25 +1,48 @@
 import os
+import sys
 import time
+import signal
+import shutil
 import logging
 import traceback
-import re
+import queue
+import uuid
+import threading
+import contextlib
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import (
     NoSuchElementException,
     TimeoutException,
     ElementClickInterceptedException,
     ElementNotInteractableException,
+    StaleElementReferenceException,
 )
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-from bs4 import BeautifulSoup
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 
-from fuzzywuzzy import fuzz, process
+import driver_pool
+import jobs
+import waits
+import dish_index
+import catalogue
+import restaurant_cache
+import launch_profile
+import metrics
+import coupons
+import coupon_cache
+import session_store
+import menu_index
+import quote_cache
+import unresolved_cache
+import availability_cache
+import order_checkpoints
+import selector_registry
+import actions
+import cart_lock
 
 app = Flask(__name__)
 
@@ -28,23 +51,45 @@ SWIGGY_URL = 'https://www.swiggy.com'
 LOGIN_TIMEOUT = 60
 POLL_INTERVAL = 2
 ADDRESS_TO_SELECT = 'Home'
-
-restaurant_dict = {
-    "Beijing Bites": ["Chicken Schezwan Fried rice", "Honey Chilli Chicken"],
-    "Quattro - The Leela Bhartiya City Bengaluru": ["Paneer Tikka", "Chicken Tikka Pizza"],
-    "Chung Wah": ["Spring Rolls", "Chicken Lung Fung Soup"],
-    "Pizza Hut": ["Margherita Pizza"],
+MAX_QUANTITY = 10
+QUOTE_SNAPSHOT_MAX_AGE = 10 * 60
+QUOTE_LEASE_TIMEOUT = 10
+MAX_RESTAURANT_FALLBACKS = 3
+ORDER_STAGES = ('restaurant_page', 'in_cart', 'address_selected', 'coupon_applied', 'payment_page', 'placed')
+STAGE_RETRIES = 2
+STAGE_RETRY_BACKOFF = 0.5
+DRAIN_TIMEOUT = int(os.environ.get('SWIGGY_DRAIN_TIMEOUT', 300))
+TRANSIENT_ERRORS = (StaleElementReferenceException, ElementClickInterceptedException, ElementNotInteractableException)
+MAX_POPUPS = 6
+MENU_POPUPS = ('customize_continue', 'start_afresh')
+CUSTOMISATION_POPUPS = ('customize_add_to_cart', 'customization_modal')
+POPUP_HANDLERS = {
+    'customize_continue': ('continue', "'Continue' pop-up"),
+    'start_afresh': ('start_afresh', "'Yes, start afresh' pop-up"),
+    'customize_add_to_cart': ('customize_footer', "'Add Item to cart' pop-up"),
+    'customization_modal': ('customization_modal', "customization modal"),
 }
+DISH_ITEM_XPATH = selector_registry.SELECTORS['dish_item'][0][1]
+
+restaurant_dict = catalogue.load_catalogue(catalogue.CATALOGUE_PATH)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-driver = None
+catalogue_index = dish_index.build_dish_index(restaurant_dict)
+
+def reload_catalogue(new_catalogue):
+    global restaurant_dict, catalogue_index
+    new_index = dish_index.build_dish_index(new_catalogue)
+    restaurant_dict, catalogue_index = new_catalogue, new_index
+    unresolved_cache.clear()
+
+def wait_for(driver, timeout, condition, selector, required=True, **params):
+    return selector_registry.wait(driver, selector, condition, timeout, required, **params)
 
 def is_logged_in(driver):
     try:
-        sign_in_xpath = "//a[text()='Sign in']"
-        driver.find_element(By.XPATH, sign_in_xpath)
+        selector_registry.find(driver, 'sign_in')
         logger.info("'Sign in' button is present. User is not logged in.")
         return False
     except NoSuchElementException:
@@ -64,26 +109,18 @@ def manual_login(driver):
     logger.warning("Login timeout reached. User is not logged in.")
     return False
 
+@metrics.timed_stage('login')
 def perform_login(driver):
     try:
-        sign_in_xpath = "//a[text()='Sign in']"
-        sign_in_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, sign_in_xpath))
-        )
+        sign_in_button = wait_for(driver, 10, EC.element_to_be_clickable, 'sign_in')
         sign_in_button.click()
         logger.info("'Sign in' button clicked.")
-        phone_input_xpath = "//input[@id='mobile']"
-        phone_input = WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.XPATH, phone_input_xpath))
-        )
+        phone_input = wait_for(driver, 10, EC.visibility_of_element_located, 'phone_input')
         phone_input.clear()
         phone_input.send_keys(PHONE_NUMBER)
         logger.info(f"Entered phone number: {PHONE_NUMBER}")
-        submit_button_xpath = "//button[span/text()='CONTINUE']"
         try:
-            submit_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, submit_button_xpath))
-            )
+            submit_button = wait_for(driver, 5, EC.element_to_be_clickable, 'login_continue', required=False)
             submit_button.click()
             logger.info("'CONTINUE' button clicked.")
         except TimeoutException:
@@ -100,25 +137,27 @@ def perform_login(driver):
         logger.info("Screenshot saved as login_error.png.")
         return False
 
+def ensure_session(driver):
+    for _ in range(2):
+        if is_logged_in(driver):
+            return True
+        if not session_store.relogin(driver, SWIGGY_URL, perform_login):
+            return False
+        waits.settle_page(driver)
+    return is_logged_in(driver)
+
+@metrics.timed_stage('select_address')
 def select_address(driver):
     try:
-        location_input = WebDriverWait(driver, 5).until(
-            EC.visibility_of_element_located((By.ID, "location"))
-        )
+        location_input = wait_for(driver, 5, EC.visibility_of_element_located, 'location_input')
         logger.info("Location input found.")
-        dropdown_div = location_input.find_element(By.XPATH, "following::div[@style='line-height:0'][1]")
+        dropdown_div = selector_registry.find(location_input, 'location_dropdown')
         logger.info("Dropdown div found.")
         dropdown_div.click()
         logger.info("Dropdown arrow clicked.")
-        addresses_container_xpath = "//div[contains(text(), 'Saved addresses')]"
-        WebDriverWait(driver, 5).until(
-            EC.visibility_of_element_located((By.XPATH, addresses_container_xpath))
-        )
+        wait_for(driver, 5, EC.visibility_of_element_located, 'saved_addresses')
         logger.info("Address dropdown is visible.")
-        address_xpath = f"//span[contains(text(), '{ADDRESS_TO_SELECT}')]"
-        address_element = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, address_xpath))
-        )
+        address_element = wait_for(driver, 7, EC.element_to_be_clickable, 'saved_address', address=ADDRESS_TO_SELECT)
         address_element.click()
         logger.info(f"Address '{ADDRESS_TO_SELECT}' selected.")
     except Exception as e:
@@ -127,78 +166,179 @@ def select_address(driver):
         driver.save_screenshot("address_selection_error.png")
         logger.info("Screenshot saved as address_selection_error.png.")
         raise e
-def search_restaurant(driver, dish):
+def return_to_home(driver):
+    if driver.current_url.rstrip('/') != SWIGGY_URL:
+        driver.get(SWIGGY_URL)
+        logger.info(f"Navigated back to {SWIGGY_URL}.")
+
+def open_cached_restaurant(driver, restaurant_name):
+    menu_url = restaurant_cache.get_url(restaurant_name)
+    if menu_url is None:
+        return False
+    driver.get(menu_url)
+    logger.info(f"Navigated to cached menu URL {menu_url} for '{restaurant_name}'.")
     try:
-        search_div_xpath = "//div[contains(text(), 'Search for restaurant, item or more')]"
-        search_div = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, search_div_xpath))
-        )
-        search_div.click()
-        logger.info("Search input div clicked.")
-        WebDriverWait(driver, 5).until(
-            EC.url_contains("/search")
-        )
-        logger.info("Navigated to search page.")
-        search_input_xpath = "//input[@placeholder='Search for restaurants and food']"
-        search_input = WebDriverWait(driver, 5).until(
-            EC.visibility_of_element_located((By.XPATH, search_input_xpath))
-        )
-        logger.info("Search input field found.")
-        logger.info(f"User entered dish: {dish}")
-
-        all_dishes = []
-        for restaurant, dishes in restaurant_dict.items():
-            for dish_name in dishes:
-                all_dishes.append((dish_name, restaurant))
-
-        dish_names = [d[0] for d in all_dishes]
-        matches = process.extractBests(dish, dish_names, scorer=fuzz.token_sort_ratio, score_cutoff=90)
-        if not matches:
-            logger.error(f"Dish '{dish}' not found in restaurant dictionary.")
-            restart_selenium()
-            raise Exception(f"Sorry, the dish '{dish}' is not available. Please suggest another dish.")
-
-        best_match = matches[0][0]
-        logger.info(f"Best matched dish: {best_match}")
-        for dish_name, restaurant in all_dishes:
-            if dish_name == best_match:
-                restaurant_name = restaurant
-                break
-
-        logger.info(f"Found restaurant '{restaurant_name}' for dish '{dish}'.")
-        search_input.clear()
-        search_input.send_keys(restaurant_name)
-        logger.info(f"Entered restaurant name '{restaurant_name}' into search input.")
-        autosuggest_xpath = "//div[contains(@class, '_29yzU')]"
+        wait_for(driver, 5, EC.presence_of_element_located, 'menu_search_button', required=False)
+    except TimeoutException:
+        logger.warning(f"Cached menu URL for '{restaurant_name}' did not load a menu. Falling back to search.")
+        restaurant_cache.invalidate(restaurant_name)
+        return False
+    if driver.current_url.split('?')[0].rstrip('/') != menu_url.split('?')[0].rstrip('/'):
+        logger.warning(f"Cached menu URL for '{restaurant_name}' redirected to {driver.current_url}. Falling back to search.")
+        restaurant_cache.invalidate(restaurant_name)
+        return False
+    return True
+
+def open_restaurant_via_search(driver, restaurant_name):
+    return_to_home(driver)
+    search_div = wait_for(driver, 5, EC.element_to_be_clickable, 'home_search_bar')
+    search_div.click()
+    logger.info("Search input div clicked.")
+    WebDriverWait(driver, 5).until(
+        EC.url_contains("/search")
+    )
+    logger.info("Navigated to search page.")
+    search_input = wait_for(driver, 5, EC.visibility_of_element_located, 'restaurant_search_input')
+    logger.info("Search input field found.")
+    search_input.clear()
+    search_input.send_keys(restaurant_name)
+    logger.info(f"Entered restaurant name '{restaurant_name}' into search input.")
+    with metrics.stage('autosuggest'):
         try:
-            WebDriverWait(driver, 5).until(
-                EC.visibility_of_element_located((By.XPATH, autosuggest_xpath))
-            )
+            # No suggestions is how Swiggy shows a closed restaurant, not a broken selector.
+            wait_for(driver, 5, EC.visibility_of_element_located, 'autosuggest', required=False)
             logger.info("Autosuggest dropdown is visible.")
-            first_suggestion_xpath = "//div[contains(@class, '_29yzU')]//button[@data-testid='autosuggest-item'][1]"
-            first_suggestion = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, first_suggestion_xpath))
-            )
+            first_suggestion = wait_for(driver, 5, EC.element_to_be_clickable, 'first_suggestion')
             first_suggestion.click()
             logger.info("First suggestion clicked.")
         except TimeoutException:
             logger.error(f"Restaurant '{restaurant_name}' is unavailable right now.")
-            restart_selenium()
+            availability_cache.mark_unavailable(restaurant_name)
             raise Exception(f"Restaurant '{restaurant_name}' is unavailable right now. Please suggest another dish.")
 
-        results_container_xpath = "//div[contains(@class, 'Search_widgetsV2__27BBR')]"
-        WebDriverWait(driver, 5).until(
-            EC.visibility_of_element_located((By.XPATH, results_container_xpath))
-        )
-        logger.info("Search results are displayed.")
-        first_result_xpath = "//div[contains(@class, 'Search_widgetsV2__27BBR')]//a[@data-testid='resturant-card-anchor-container'][1]"
-        first_result = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, first_result_xpath))
-        )
-        first_result.click()
-        logger.info("First restaurant item clicked.")
+    wait_for(driver, 5, EC.visibility_of_element_located, 'search_results')
+    logger.info("Search results are displayed.")
+    first_result = wait_for(driver, 5, EC.element_to_be_clickable, 'first_restaurant_card')
+    menu_url = first_result.get_attribute('href')
+    first_result.click()
+    logger.info("First restaurant item clicked.")
+    if menu_url:
+        restaurant_cache.save_url(restaurant_name, menu_url)
+
+def unknown_dish_message(dish, suggestions):
+    message = f"Sorry, the dish '{dish}' is not available."
+    if suggestions:
+        return f"{message} Did you mean {', '.join(suggestions)}?"
+    return f"{message} Please suggest another dish."
+
+def dish_candidates(dish, exclude=()):
+    index = catalogue_index
+    candidates = {}
+    for dish_name, score in dish_index.find_dishes(index, dish, score_cutoff=90):
+        for restaurant_name in dish_index.restaurants_for(index, dish_name):
+            if restaurant_name in exclude or restaurant_name in candidates:
+                continue
+            rank = (
+                availability_cache.is_unavailable(restaurant_name),
+                -score,
+                not availability_cache.is_recently_available(restaurant_name),
+                len(candidates),
+            )
+            candidates[restaurant_name] = (rank, dish_name)
+    ranked = sorted(candidates.items(), key=lambda candidate: candidate[1][0])
+    return [(dish_name, restaurant_name) for restaurant_name, (_, dish_name) in ranked]
+
+@metrics.timed_stage('resolve_dish')
+def resolve_dish(dish, exclude=()):
+    suggestions = unresolved_cache.get_suggestions(dish)
+    if suggestions is None:
+        candidates = dish_candidates(dish, exclude)
+        if candidates:
+            best_match, restaurant_name = candidates[0]
+            logger.info(f"Best matched dish: {best_match}")
+            logger.info(f"Found restaurant '{restaurant_name}' for dish '{dish}'.")
+            return best_match, restaurant_name
+        if exclude:
+            raise Exception(f"No other restaurant offers '{dish}' right now. Please suggest another dish.")
+        suggestions = dish_index.suggest_dishes(catalogue_index, dish)
+        unresolved_cache.save_suggestions(dish, suggestions)
+    logger.error(f"Dish '{dish}' not found in restaurant dictionary.")
+    raise Exception(unknown_dish_message(dish, suggestions))
+
+def find_unknown_dishes(items):
+    unknown_dishes = []
+    for item in items:
+        try:
+            resolve_dish(item['dish'])
+        except Exception:
+            unknown_dishes.append({
+                "dish": item['dish'],
+                "suggestions": unresolved_cache.get_suggestions(item['dish']) or [],
+            })
+    return unknown_dishes
+
+def prefetch_menu(driver, restaurant_name):
+    menu_url = restaurant_cache.get_url(restaurant_name)
+    if menu_url is None:
+        return None
+    try:
+        known_handles = set(driver.window_handles)
+        driver.execute_script("window.open(arguments[0], '_blank');", menu_url)
+        new_handles = [handle for handle in driver.window_handles if handle not in known_handles]
+    except Exception as e:
+        logger.warning(f"Could not open a prefetch tab for '{restaurant_name}': {e}")
+        return None
+    if not new_handles:
+        logger.warning(f"Prefetch tab for '{restaurant_name}' did not open.")
+        return None
+    logger.info(f"Prefetching the menu of '{restaurant_name}' in a second tab.")
+    return {"restaurant_name": restaurant_name, "url": menu_url, "handle": new_handles[0]}
+
+def discard_prefetch(driver, prefetch):
+    try:
+        main_handle = driver.current_window_handle
+        driver.switch_to.window(prefetch['handle'])
+        driver.close()
+        driver.switch_to.window(main_handle)
+    except Exception as e:
+        logger.warning(f"Could not close the prefetch tab: {e}")
+
+def adopt_prefetched_menu(driver, prefetch):
+    main_handle = driver.current_window_handle
+    driver.switch_to.window(prefetch['handle'])
+    try:
+        wait_for(driver, 5, EC.presence_of_element_located, 'menu_search_button', required=False)
+        ready = (driver.current_url.split('?')[0].rstrip('/') == prefetch['url'].split('?')[0].rstrip('/')
+                 and is_logged_in(driver))
+    except TimeoutException:
+        ready = False
+    if not ready:
+        logger.warning(f"Prefetched menu for '{prefetch['restaurant_name']}' is not usable. Falling back.")
+        metrics.record_prefetch('miss')
+        driver.close()
+        driver.switch_to.window(main_handle)
+        restaurant_cache.invalidate(prefetch['restaurant_name'])
+        return False
+    driver.switch_to.window(main_handle)
+    driver.close()
+    driver.switch_to.window(prefetch['handle'])
+    metrics.record_prefetch('hit')
+    logger.info(f"Switched to the prefetched menu of '{prefetch['restaurant_name']}'.")
+    return True
+
+@metrics.timed_stage('search')
+def search_restaurant(driver, restaurant_name, prefetch=None):
+    try:
+        jobs.update_stage('searching')
+        if prefetch is not None and prefetch['restaurant_name'] == restaurant_name:
+            if adopt_prefetched_menu(driver, prefetch):
+                logger.info("Restaurant page loaded.")
+                return
+        elif prefetch is not None:
+            discard_prefetch(driver, prefetch)
+        if not open_cached_restaurant(driver, restaurant_name):
+            open_restaurant_via_search(driver, restaurant_name)
         logger.info("Restaurant page loaded.")
-        add_dish_to_cart(driver, best_match)
     except Exception as e:
         logger.error("An error occurred during the search process:")
         logger.error(traceback.format_exc())
@@ -206,59 +346,248 @@ def search_restaurant(driver, dish):
         logger.info("Screenshot saved as search_error.png.")
         raise e
 
-def add_dish_to_cart(driver, dish_name):
+def add_to_group(groups, restaurant_name, dish_name, query, quantity):
+    dishes = groups.setdefault(restaurant_name, {})
+    if dish_name in dishes:
+        total = dishes[dish_name]['quantity'] + quantity
+        if total > MAX_QUANTITY:
+            raise ValueError(f"'{dish_name}' is ordered {total} times in total. The most is {MAX_QUANTITY}.")
+        dishes[dish_name]['quantity'] = total
+    else:
+        dishes[dish_name] = {"query": query, "quantity": quantity}
+
+def group_items(items):
+    groups = {}
+    for item in items:
+        logger.info(f"User entered dish: {item['dish']}")
+        dish_name, restaurant_name = resolve_dish(item['dish'])
+        add_to_group(groups, restaurant_name, dish_name, item['dish'], item['quantity'])
+    return groups
+
+def regroup_dishes(dishes, pending, tried):
+    for dish_name, dish in dishes.items():
+        new_dish_name, restaurant_name = resolve_dish(dish['query'], exclude=tried)
+        logger.info(f"Moving '{dish_name}' to '{new_dish_name}' from '{restaurant_name}'.")
+        metrics.record_restaurant_fallback(restaurant_name)
+        add_to_group(pending, restaurant_name, new_dish_name, dish['query'], dish['quantity'])
+
+def new_checkpoint(items):
+    return {
+        "items": items,
+        "pending": group_items(items),
+        "placed": [],
+        "tried": [],
+        "restaurant": None,
+        "stage": None,
+        "cart_total": None,
+    }
+
+def save_progress(checkpoint):
+    job_id = jobs.current_job_id()
+    if job_id is not None:
+        order_checkpoints.save_checkpoint(job_id, checkpoint)
+
+def stages_to_run(stage):
+    if stage in (None, 'restaurant_page'):
+        return list(ORDER_STAGES)
+    if ORDER_STAGES.index(stage) < ORDER_STAGES.index('coupon_applied'):
+        return ['address_selected', 'coupon_applied', 'payment_page', 'placed']
+    return ['address_selected', 'payment_page', 'placed']
+
+def reach_restaurant(driver, order):
+    prefetch, order['prefetch'] = order['prefetch'], None
+    search_restaurant(driver, order['restaurant_name'], prefetch)
+    availability_cache.mark_available(order['restaurant_name'])
+
+def fill_cart(driver, order):
+    for dish_name, dish in order['dishes'].items():
+        add_dish_to_cart(driver, dish_name, dish['quantity'], order['restaurant_name'])
+    jobs.update_stage('in_cart')
+
+def reach_checkout(driver, order):
+    order['cart_total'] = select_checkout_address(driver, resume=order.pop('resume', False))
+
+def apply_order_coupon(driver, order):
+    apply_best_coupon(driver, order['restaurant_name'], order['cart_total'])
+
+def reach_payment_page(driver, order):
+    open_payment_page(driver)
+
+def pay_order(driver, order):
+    pay_with_swiggy_money(driver)
+
+ORDER_STAGE_ACTIONS = {
+    'restaurant_page': reach_restaurant,
+    'in_cart': fill_cart,
+    'address_selected': reach_checkout,
+    'coupon_applied': apply_order_coupon,
+    'payment_page': reach_payment_page,
+    'placed': pay_order,
+}
+
+def run_stage(driver, stage, order):
+    retries = 0 if stage == 'placed' else STAGE_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            ORDER_STAGE_ACTIONS[stage](driver, order)
+            return
+        except TRANSIENT_ERRORS as e:
+            if attempt == retries:
+                raise
+            delay = STAGE_RETRY_BACKOFF * 2 ** attempt
+            logger.warning(f"Stage '{stage}' failed with {type(e).__name__}. Retrying it in {delay}s ({attempt + 1}/{retries}).")
+            metrics.record_stage_retry(stage)
+            time.sleep(delay)
+            waits.settle_dom(driver)
+
+def refill_cart(driver, order):
+    logger.warning(f"Another order used the account cart since this one filled it. Adding the dishes from '{order['restaurant_name']}' again.")
+    order['resume'] = False
+    for stage in ('restaurant_page', 'in_cart'):
+        run_stage(driver, stage, order)
+
+def place_order(driver, checkpoint):
+    owner = jobs.current_job_id() or uuid.uuid4().hex
+    pending = checkpoint['pending']
+    if not pending:
+        # The worker stopped after paying for the last restaurant but before discarding the checkpoint.
+        logger.info(f"Every restaurant of this order was already placed: {', '.join(checkpoint['placed'])}.")
+        return
+    tried = set(checkpoint['tried'])
+    fallbacks = 0
+    # Only the next restaurant is prefetched, while the current one checks out. Opening the first one in
+    # a second tab would overlap with nothing and cost more calls than loading it directly.
+    prefetch = None
     try:
-        search_button_xpath = "//button[.//div[text()='Search for dishes']]"
-        search_button = WebDriverWait(driver, 7).until(
-            EC.presence_of_element_located((By.XPATH, search_button_xpath))
-        )
+        if not ensure_session(driver):
+            raise Exception("Swiggy session expired and logging in again failed.")
+        while pending:
+            restaurant_name = next(iter(pending))
+            dishes = pending[restaurant_name]
+            resumed_stage = checkpoint['stage'] if checkpoint['restaurant'] == restaurant_name else None
+            stages = stages_to_run(resumed_stage)
+            if resumed_stage is not None:
+                logger.info(f"Resuming the order from '{restaurant_name}' after stage '{resumed_stage}'.")
+            else:
+                logger.info(f"Ordering {len(dishes)} dish(es) from '{restaurant_name}'.")
+            tried.add(restaurant_name)
+            checkpoint.update(restaurant=restaurant_name, stage=resumed_stage, tried=sorted(tried))
+            order = {
+                "restaurant_name": restaurant_name,
+                "dishes": dishes,
+                "prefetch": prefetch,
+                "cart_total": checkpoint['cart_total'] if resumed_stage else None,
+                "resume": stages[0] == 'address_selected',
+            }
+            prefetch = None
+            cart_held = False
+            try:
+                with contextlib.ExitStack() as cart:
+                    for stage in stages:
+                        # Hold the account cart from the first dish added until this restaurant is paid for.
+                        if stage != 'restaurant_page' and not cart_held:
+                            cart_held = True
+                            previous_owner = cart.enter_context(cart_lock.holding_cart(owner))
+                            if stage != 'in_cart' and previous_owner != owner:
+                                refill_cart(driver, order)
+                        run_stage(driver, stage, order)
+                        if stage == 'placed':
+                            break
+                        checkpoint.update(stage=stage, cart_total=order['cart_total'])
+                        save_progress(checkpoint)
+                        if stage == 'in_cart' and len(pending) > 1:
+                            prefetch = prefetch_menu(driver, list(pending)[1])
+            except Exception:
+                if (stage != 'restaurant_page' or not availability_cache.is_unavailable(restaurant_name)
+                        or fallbacks >= MAX_RESTAURANT_FALLBACKS):
+                    raise
+                fallbacks += 1
+                del pending[restaurant_name]
+                regroup_dishes(dishes, pending, tried)
+                checkpoint.update(restaurant=None, stage=None)
+                save_progress(checkpoint)
+                continue
+            del pending[restaurant_name]
+            checkpoint['placed'].append(restaurant_name)
+            checkpoint.update(restaurant=None, stage=None, cart_total=None)
+            save_progress(checkpoint)
+    except Exception:
+        if prefetch is not None:
+            discard_prefetch(driver, prefetch)
+        raise
+
+def search_menu_for_dish(driver, dish_name):
+    open_inputs = [element for element in selector_registry.find_all(driver, 'menu_search_input') if element.is_displayed()]
+    if open_inputs:
+        logger.info("Dish search input is already open. Reusing it.")
+    else:
+        search_button = wait_for(driver, 7, EC.presence_of_element_located, 'menu_search_button')
         logger.info("Search button found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", search_button)
-        time.sleep(0.5)
+        waits.settle_after_scroll(driver, search_button)
         try:
             search_button.click()
             logger.info("Clicked the search button on the restaurant page.")
         except Exception as e:
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
+            metrics.record_fallback('search')
             driver.execute_script("arguments[0].click();", search_button)
             logger.info("Clicked the search button using JavaScript.")
-        search_input_xpath = "//input[@data-cy='menu-search-header']"
-        search_input = WebDriverWait(driver, 7).until(
-            EC.visibility_of_element_located((By.XPATH, search_input_xpath))
-        )
-        logger.info("Dish search input field found.")
-        search_input.clear()
-        search_input.send_keys(dish_name)
-        logger.info(f"Entered dish name '{dish_name}' into search input.")
-        dish_list_xpath = "//div[@data-testid='normal-dish-item']"
-        WebDriverWait(driver, 7).until(
-            EC.visibility_of_element_located((By.XPATH, dish_list_xpath))
-        )
-        logger.info("Dish list is displayed.")
-        first_dish_xpath = f"({dish_list_xpath})[1]"
-        first_dish = driver.find_element(By.XPATH, first_dish_xpath)
-        logger.info("First dish item found.")
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", first_dish)
-        time.sleep(0.5)
-        minus_button_xpath = ".//button[contains(@class, 'add-button-left-container')]//div[text()='−']"
-        add_button_xpath = ".//button[contains(@class, 'add-button-center-container')]"
+    search_input = wait_for(driver, 7, EC.visibility_of_element_located, 'menu_search_input')
+    logger.info("Dish search input field found.")
+    search_input.clear()
+    search_input.send_keys(dish_name)
+    logger.info(f"Entered dish name '{dish_name}' into search input.")
+    waits.settle_page(driver, fallback=0.5)
+    wait_for(driver, 7, EC.visibility_of_element_located, 'dish_item')
+    logger.info("Dish list is displayed.")
+    position = menu_index.locate_dish(driver, dish_name)
+    if position is None:
+        logger.warning(f"No search result is named exactly '{dish_name}'. Using the first result.")
+        position = 1
+    return f"({DISH_ITEM_XPATH})[{position}]"
+
+def locate_indexed_dish(driver, indexed_dish):
+    if indexed_dish.get('id'):
+        dish_xpath = f"{DISH_ITEM_XPATH}[@id='{indexed_dish['id']}' or .//*[@id='{indexed_dish['id']}']]"
+        if driver.find_elements(By.XPATH, dish_xpath):
+            logger.info(f"Found '{indexed_dish['name']}' on the menu by its id {indexed_dish['id']}.")
+            return dish_xpath
+    position = menu_index.locate_dish(driver, indexed_dish['name'])
+    if position is None:
+        logger.info(f"'{indexed_dish['name']}' is not rendered on the menu. Searching for it instead.")
+        return None
+    logger.info(f"Found '{indexed_dish['name']}' on the menu by name.")
+    return f"({DISH_ITEM_XPATH})[{position}]"
+
+@metrics.timed_stage('add_dish_to_cart')
+def add_dish_to_cart(driver, dish_name, quantity=1, restaurant_name=None):
+    try:
+        indexed_dish = menu_index.find_dish(restaurant_name, dish_name) if restaurant_name else None
+        dish_xpath = locate_indexed_dish(driver, indexed_dish) if indexed_dish else None
+        if dish_xpath is None:
+            dish_xpath = search_menu_for_dish(driver, dish_name)
+        dish_element = driver.find_element(By.XPATH, dish_xpath)
+        logger.info("Dish item found.")
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dish_element)
+        waits.settle_after_scroll(driver, dish_element)
 
         def remove_existing_quantities():
             try:
-                minus_button = first_dish.find_element(By.XPATH, minus_button_xpath)
+                minus_button = selector_registry.find(dish_element, 'dish_minus_button')
                 logger.info("Minus button found. Removing existing quantities.")
                 max_attempts = 5
                 attempts = 0
                 while attempts < max_attempts:
                     minus_button.click()
                     logger.info("Clicked the minus button to remove one item.")
-                    time.sleep(0.5)
+                    waits.settle_dom(driver)
                     try:
-                        first_dish.find_element(By.XPATH, add_button_xpath)
+                        selector_registry.find(dish_element, 'dish_add_button')
                         logger.info("'Add' button is now present.")
                         break
                     except:
-                        minus_button = first_dish.find_element(By.XPATH, minus_button_xpath)
+                        minus_button = selector_registry.find(dish_element, 'dish_minus_button')
                     attempts += 1
                 else:
                     logger.warning("Minus button still present after maximum attempts.")
@@ -266,10 +595,8 @@ def add_dish_to_cart(driver, dish_name):
                 logger.info("Minus button not present. No existing quantities to remove.")
 
         remove_existing_quantities()
-        add_button = first_dish.find_element(By.XPATH, add_button_xpath)
-        WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.XPATH, add_button_xpath))
-        )
+        add_button = selector_registry.find(dish_element, 'dish_add_button')
+        WebDriverWait(driver, 5).until(EC.element_to_be_clickable(add_button))
 
         def click_add_button():
             try:
@@ -278,13 +605,15 @@ def add_dish_to_cart(driver, dish_name):
                 return True
             except Exception as e:
                 logger.warning(f"Normal click on add button failed: {e}. Trying ActionChains click.")
+                metrics.record_fallback('add')
                 try:
-                    actions = ActionChains(driver)
-                    actions.move_to_element(add_button).click().perform()
+                    action_chain = ActionChains(driver)
+                    action_chain.move_to_element(add_button).click().perform()
                     logger.info("Clicked the add button using ActionChains.")
                     return True
                 except Exception as e:
                     logger.warning(f"ActionChains click failed: {e}. Trying JavaScript click.")
+                    metrics.record_fallback('add')
                     try:
                         driver.execute_script("arguments[0].click();", add_button)
                         logger.info("Clicked the add button using JavaScript.")
@@ -295,94 +624,55 @@ def add_dish_to_cart(driver, dish_name):
 
         clicked = click_add_button()
 
-        def handle_popups():
-            max_attempts = 3
-            attempts = 0
-            while attempts < max_attempts:
-                popups_handled = False
-
-                try:
-                    continue_button_xpath = "//button[@data-testid='menu-customize-continue-button']"
-                    continue_button = WebDriverWait(driver, 2).until(
-                        EC.element_to_be_clickable((By.XPATH, continue_button_xpath))
-                    )
-                    logger.info("'Continue' pop-up appeared.")
-                    driver.execute_script("arguments[0].scrollIntoView(true);", continue_button)
-                    time.sleep(0.5)
+        def handle_popups(popups):
+            for _ in range(MAX_POPUPS):
+                found = selector_registry.detect(driver, popups)
+                if found is None:
+                    logger.info("No pop-ups appeared. Proceeding.")
+                    return
+                popup, element = found
+                label, popup_name = POPUP_HANDLERS[popup]
+                logger.info(f"{popup_name} appeared.")
+                if popup == 'customization_modal':
                     try:
-                        continue_button.click()
-                        logger.info("Clicked the 'Continue' button on the pop-up.")
-                    except Exception as e:
-                        logger.warning(f"Click on 'Continue' button failed: {e}. Trying JavaScript click.")
-                        driver.execute_script("arguments[0].click();", continue_button)
-                        logger.info("Clicked the 'Continue' button using JavaScript.")
-                    popups_handled = True
-                except TimeoutException:
-                    logger.info("No 'Continue' pop-up appeared.")
-
+                        element = selector_registry.find(driver, 'modal_add_item')
+                    except NoSuchElementException:
+                        logger.warning("Customization modal has no 'Add Item' button.")
+                        return
+                driver.execute_script("arguments[0].scrollIntoView(true);", element)
+                waits.settle_after_scroll(driver, element)
                 try:
-                    popup_button_xpath = "//button[contains(@class, 'hoJL8') and text()='Yes, start afresh']"
-                    popup_button = WebDriverWait(driver, 2).until(
-                        EC.element_to_be_clickable((By.XPATH, popup_button_xpath))
-                    )
-                    logger.info("'Yes, start afresh' pop-up appeared.")
-                    driver.execute_script("arguments[0].scrollIntoView(true);", popup_button)
-                    time.sleep(0.5)
-                    try:
-                        popup_button.click()
-                        logger.info("Clicked 'Yes, start afresh' button on the pop-up.")
-                    except Exception as e:
-                        logger.warning(f"Click on 'Yes, start afresh' button failed: {e}. Trying JavaScript click.")
-                        driver.execute_script("arguments[0].click();", popup_button)
-                        logger.info("Clicked 'Yes, start afresh' button using JavaScript.")
-                    popups_handled = True
-                except TimeoutException:
-                    logger.info("No 'Yes, start afresh' pop-up appeared.")
-
-                if not popups_handled:
-                    logger.info("No pop-ups appeared. Proceeding.")
-                    break
-                else:
-                    time.sleep(0.5)
-                attempts += 1
+                    element.click()
+                    logger.info(f"Clicked the button on the {popup_name}.")
+                except Exception as e:
+                    logger.warning(f"Click on the {popup_name} failed: {e}. Trying JavaScript click.")
+                    metrics.record_fallback(label)
+                    driver.execute_script("arguments[0].click();", element)
+                    logger.info(f"Clicked the button on the {popup_name} using JavaScript.")
+                metrics.record_popup(label)
+                waits.settle_dom(driver)
+            logger.warning(f"Pop-ups were still appearing after handling {MAX_POPUPS} of them.")
 
-        handle_popups()
+        waits.settle_dom(driver)
+        # Checking every pop-up costs one script call, so do not trust the snapshot's customisable guess here.
+        handle_popups(MENU_POPUPS + CUSTOMISATION_POPUPS)
 
-        try:
-            add_item_to_cart_button_xpath = "//button[@data-cy='customize-footer-add-button']"
-            add_item_to_cart_button = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.XPATH, add_item_to_cart_button_xpath))
-            )
-            add_item_to_cart_button.click()
-            logger.info("Clicked 'Add Item to cart' button in the pop-up.")
-        except TimeoutException:
-            logger.info("No 'Add Item to cart' pop-up appeared. Proceeding to the next step.")
-        except Exception as e:
-            logger.warning(f"Failed to click 'Add Item to cart' button: {e}. Trying JavaScript click.")
+        waits.settle_page(driver)
+        for added in range(1, quantity):
+            dish_element = driver.find_element(By.XPATH, dish_xpath)
+            plus_button = selector_registry.find(dish_element, 'dish_plus_button')
             try:
-                driver.execute_script("arguments[0].click();", add_item_to_cart_button)
-                logger.info("Clicked 'Add Item to cart' button using JavaScript.")
+                plus_button.click()
+                logger.info(f"Clicked the plus button. Quantity is now {added + 1}.")
             except Exception as e:
-                logger.error(f"All methods failed to click 'Add Item to cart' button: {e}.")
-
-        try:
-            modal_xpath = "//div[contains(@class, 'styles_container__')]"
-            WebDriverWait(driver, 3).until(
-                EC.visibility_of_element_located((By.XPATH, modal_xpath))
-            )
-            logger.info("Customization modal is displayed.")
-            add_item_button_xpath = "//button[normalize-space()='Add Item']"
-            add_item_button = driver.find_element(By.XPATH, add_item_button_xpath)
-            add_item_button.click()
-            logger.info("Add Item button in the modal clicked.")
-        except TimeoutException:
-            logger.info("No customization modal appeared.")
-        except Exception as e:
-            logger.warning(f"Failed to handle customization modal: {e}.")
-
-        time.sleep(1)
-        logger.info(f"Dish '{dish_name}' added to the cart.")
-        checkout(driver)
+                logger.warning(f"Normal click on plus button failed: {e}. Trying JavaScript click.")
+                metrics.record_fallback('plus')
+                driver.execute_script("arguments[0].click();", plus_button)
+                logger.info(f"Clicked the plus button using JavaScript. Quantity is now {added + 1}.")
+            waits.settle_dom(driver)
+            handle_popups(MENU_POPUPS)
+            waits.settle_page(driver)
+        logger.info(f"Dish '{dish_name}' x{quantity} added to the cart.")
 
     except Exception as e:
         logger.error("An error occurred while adding the dish to the cart:")
@@ -391,274 +681,457 @@ def add_dish_to_cart(driver, dish_name):
         logger.info("Screenshot saved as add_dish_error.png.")
         raise e
 
-def checkout(driver):
+def read_cart_total(driver):
+    for locator in selector_registry.locators('cart_total'):
+        for element in driver.find_elements(*locator):
+            cart_total = coupons.parse_amount(element.text)
+            if cart_total is not None:
+                logger.info(f"Cart total is ₹{cart_total}.")
+                return cart_total
+    logger.warning("Could not read the cart total. Ranking coupons without it.")
+    return None
+
+def coupon_accepted(driver, coupon_popup):
     try:
-        view_cart_button_xpath = "//button[@id='view-cart-btn']"
-        view_cart_button = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, view_cart_button_xpath))
-        )
-        logger.info("View Cart button found.")
-        driver.execute_script("arguments[0].scrollIntoView(true);", view_cart_button)
-        time.sleep(0.5)
-        try:
-            view_cart_button.click()
-            logger.info("Clicked the View Cart button.")
-        except Exception as e:
-            logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-            driver.execute_script("arguments[0].click();", view_cart_button)
-            logger.info("Clicked the View Cart button using JavaScript.")
-        address_div_xpath = f"//div[@class='PPJbN' and text()='{ADDRESS_TO_SELECT}']/ancestor::div[@class='_3FahR']"
-        address_div = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, address_div_xpath))
-        )
-        logger.info("Address div found.")
-        driver.execute_script("arguments[0].scrollIntoView(true);", address_div)
-        time.sleep(0.5)
+        WebDriverWait(driver, 4).until(EC.any_of(
+            EC.invisibility_of_element(coupon_popup),
+            *[EC.visibility_of_element_located(locator) for locator in selector_registry.locators('coupon_yay')],
+        ))
+        return True
+    except TimeoutException:
+        return False
+
+def scrape_coupon_candidates(driver, coupon_popup, restaurant_name, cart_total):
+    available_coupons = coupons.extract_coupons(driver, coupon_popup)
+    if available_coupons is None:
+        logger.info("Available Coupons section not found.")
+        return []
+    logger.info(f"Found {len(available_coupons)} coupon(s) in the popup.")
+    if restaurant_name:
+        coupon_cache.save_coupons(restaurant_name, cart_total, available_coupons)
+    coupon_candidates = coupons.rank_coupons(available_coupons, cart_total)
+    if not coupon_candidates:
+        logger.info("No valid app-eligible coupons available.")
+    return coupon_candidates
+
+def apply_coupon_candidates(driver, coupon_candidates, coupon_popup, restaurant_name, cart_total):
+    if restaurant_name:
+        coupon_candidates = coupon_cache.order_candidates(restaurant_name, cart_total, coupon_candidates)
+    tried_codes = []
+    for candidate in coupon_candidates[:coupons.MAX_COUPON_ATTEMPTS]:
+        coupon_to_apply = candidate['code']
+        tried_codes.append(coupon_to_apply)
+        if candidate['saving']:
+            logger.info(f"Applying coupon: {coupon_to_apply} (saves about ₹{candidate['saving']})")
+        else:
+            logger.info(f"Applying coupon: {coupon_to_apply} (saving unknown without the cart total)")
+        logger.info(f"Description: {candidate['description']}")
+        coupon_input = wait_for(driver, 7, EC.presence_of_element_located, 'coupon_input')
+        logger.info("Coupon input field found.")
+        coupon_input.clear()
+        coupon_input.send_keys(coupon_to_apply)
+        logger.info(f"Entered coupon code: {coupon_to_apply}")
+        apply_button = wait_for(driver, 7, EC.element_to_be_clickable, 'coupon_apply')
+        logger.info("Apply button found.")
         try:
-            address_div.click()
-            logger.info("Clicked the address div to select delivery address.")
+            apply_button.click()
+            logger.info("Clicked the Apply button to apply the coupon.")
         except Exception as e:
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-            driver.execute_script("arguments[0].click();", address_div)
-            logger.info("Clicked the address div using JavaScript.")
-        apply_coupon_button_xpath = "//div[@role='button' and @aria-label='Apply Coupon']"
-        apply_coupon_button = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, apply_coupon_button_xpath))
-        )
-        logger.info("Apply Coupon button found.")
-        driver.execute_script("arguments[0].scrollIntoView(true);", apply_coupon_button)
-        time.sleep(0.5)
-        try:
-            apply_coupon_button.click()
+            metrics.record_fallback('apply')
+            driver.execute_script("arguments[0].click();", apply_button)
+            logger.info("Clicked the Apply button using JavaScript.")
+        accepted = coupon_accepted(driver, coupon_popup)
+        if restaurant_name:
+            coupon_cache.record_outcome(restaurant_name, cart_total, coupon_to_apply, accepted)
+        if accepted:
+            logger.info(f"Coupon {coupon_to_apply} was accepted.")
+            jobs.update_stage('coupon_applied')
+            return coupon_to_apply, tried_codes
+        logger.warning(f"Coupon {coupon_to_apply} was rejected. Trying the next best coupon.")
+    return None, tried_codes
+
+def log_checkout_error(driver):
+    logger.error("An error occurred during checkout:")
+    logger.error(traceback.format_exc())
+    driver.save_screenshot("checkout_error.png")
+    logger.info("Screenshot saved as checkout_error.png.")
+
+@metrics.timed_stage('checkout_address')
+def select_checkout_address(driver, resume=False):
+    try:
+        if resume:
+            driver.get(f"{SWIGGY_URL}/checkout")
+            logger.info("Resuming the order on the checkout page.")
+        elif '/checkout' not in driver.current_url:
+            actions.click(driver, 'view_cart', 7)
+            logger.info("Clicked the View Cart button.")
+        actions.click(driver, 'checkout_address', 7, label='address', address=ADDRESS_TO_SELECT)
+        logger.info("Clicked the address div to select delivery address.")
+        return read_cart_total(driver)
+    except Exception as e:
+        log_checkout_error(driver)
+        raise e
+
+@metrics.timed_stage('coupon')
+def apply_best_coupon(driver, restaurant_name=None, cart_total=None):
+    try:
+        if selector_registry.detect(driver, ('coupon_popup',)) is None:
+            actions.click(driver, 'apply_coupon', 7, verify='coupon_popup')
             logger.info("Clicked the Apply Coupon button.")
-        except Exception as e:
-            logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-            driver.execute_script("arguments[0].click();", apply_coupon_button)
-            logger.info("Clicked the Apply Coupon button using JavaScript.")
-        coupon_popup_xpath = "//div[contains(@class, '_2qrkp')]"
-        coupon_popup = WebDriverWait(driver, 7).until(
-            EC.visibility_of_element_located((By.XPATH, coupon_popup_xpath))
-        )
-        logger.info("Coupon popup appeared.")
-        coupon_popup_element = driver.find_element(By.XPATH, coupon_popup_xpath)
-        try:
-            last_height = driver.execute_script("return arguments[0].scrollHeight", coupon_popup_element)
-            logger.info(f"Initial scroll height: {last_height}")
-            while True:
-                driver.execute_script("arguments[0].scrollTo(0, arguments[0].scrollHeight);", coupon_popup_element)
-                time.sleep(0.5)
-                new_height = driver.execute_script("return arguments[0].scrollHeight", coupon_popup_element)
-                logger.info(f"New scroll height: {new_height}")
-                if new_height == last_height:
-                    logger.info("Reached the bottom of the coupon popup.")
-                    break
-                last_height = new_height
-        except Exception as e:
-            logger.warning(f"Could not scroll the coupon popup: {e}")
-        coupon_popup_html = coupon_popup_element.get_attribute('innerHTML')
-        soup = BeautifulSoup(coupon_popup_html, 'html.parser')
-        card_keywords = ['card', 'credit', 'debit', 'bank', 'upi', 'payment', 'amazon pay', 'wallet', 'flash', 'cred', 'simpl']
-        available_coupons_header = soup.find('h2', text='Available Coupons')
-        if available_coupons_header:
-            available_coupons_section = available_coupons_header.find_next_sibling('div')
-            coupons = available_coupons_section.find_all('div', class_='xKU6G')
-            valid_coupons = []
-            for coupon in coupons:
-                coupon_code_tag = coupon.find('span', class_='_3vb2y')
-                if coupon_code_tag:
-                    coupon_code = coupon_code_tag.get_text(strip=True)
-                else:
-                    continue
-                description_tag = coupon.find('div', class_='BT4Uo')
-                if description_tag:
-                    description = description_tag.get_text(strip=True)
-                else:
-                    description = ''
-                terms_tag = coupon.find('div', class_='_3J1AT')
-                if terms_tag:
-                    terms = terms_tag.get_text(strip=True)
-                else:
-                    terms = ''
-                combined_text = f"{description} {terms}".lower()
-                if any(keyword in combined_text for keyword in card_keywords):
-                    continue
-                valid_coupons.append({
-                    'code': coupon_code,
-                    'description': description,
-                    'terms': terms
-                })
-            if valid_coupons:
-                def extract_discount(coupon):
-                    matches = re.findall(r'₹\d+', coupon['description'])
-                    if matches:
-                        return int(matches[0].replace('₹', ''))
-                    else:
-                        return 0
-                valid_coupons.sort(key=extract_discount, reverse=True)
-                coupon_to_apply = valid_coupons[0]['code']
-                logger.info(f"Applying coupon: {coupon_to_apply}")
-                logger.info(f"Description: {valid_coupons[0]['description']}")
-            else:
-                logger.info("No valid app-eligible coupons available.")
-                coupon_to_apply = None
         else:
-            logger.info("Available Coupons section not found.")
-            coupon_to_apply = None
-        if coupon_to_apply:
-            coupon_input_xpath = "//input[@placeholder='Enter coupon code']"
-            coupon_input = WebDriverWait(driver, 7).until(
-                EC.presence_of_element_located((By.XPATH, coupon_input_xpath))
-            )
-            logger.info("Coupon input field found.")
-            coupon_input.clear()
-            coupon_input.send_keys(coupon_to_apply)
-            logger.info(f"Entered coupon code: {coupon_to_apply}")
-            apply_button_xpath = "//a[text()='APPLY']"
-            apply_button = WebDriverWait(driver, 7).until(
-                EC.element_to_be_clickable((By.XPATH, apply_button_xpath))
+            logger.info("Coupon popup is already open.")
+        with metrics.stage('coupon_scrape'):
+            coupon_popup = wait_for(driver, 7, EC.visibility_of_element_located, 'coupon_popup')
+            logger.info("Coupon popup appeared.")
+            cached_coupons = coupon_cache.get_coupons(restaurant_name, cart_total) if restaurant_name else None
+            if cached_coupons is not None:
+                logger.info(f"Using {len(cached_coupons)} cached coupon(s) for '{restaurant_name}'. Skipping the popup scrape.")
+                coupon_candidates = coupons.rank_coupons(cached_coupons, cart_total)
+            else:
+                coupon_candidates = scrape_coupon_candidates(driver, coupon_popup, restaurant_name, cart_total)
+        applied_coupon, tried_codes = apply_coupon_candidates(
+            driver, coupon_candidates, coupon_popup, restaurant_name, cart_total
+        )
+        if applied_coupon is None and cached_coupons is not None and tried_codes:
+            logger.info("Cached coupons were rejected. Scraping the popup for fresh coupons.")
+            with metrics.stage('coupon_scrape'):
+                coupon_candidates = scrape_coupon_candidates(driver, coupon_popup, restaurant_name, cart_total)
+            coupon_candidates = [candidate for candidate in coupon_candidates if candidate['code'] not in tried_codes]
+            applied_coupon, _ = apply_coupon_candidates(
+                driver, coupon_candidates, coupon_popup, restaurant_name, cart_total
             )
-            logger.info("Apply button found.")
-            try:
-                apply_button.click()
-                logger.info("Clicked the Apply button to apply the coupon.")
-            except Exception as e:
-                logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-                driver.execute_script("arguments[0].click();", apply_button)
-                logger.info("Clicked the Apply button using JavaScript.")
-        else:
+        if applied_coupon is None:
             logger.info("No valid coupon to apply.")
-        close_button_xpath = "//span[contains(@class, '_1X6No')]"
-        try:
-            close_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, close_button_xpath))
-            )
-            close_button.click()
-            logger.info("Closed the coupon popup.")
-        except Exception as e:
-            logger.warning(f"Could not close the coupon popup: {e}")
-        try:
-            yay_button_xpath = "//button[contains(@class, '_1vTiX') and text()='YAY!']"
-            yay_button = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.XPATH, yay_button_xpath))
-            )
-            logger.info("YAY! button found.")
-            driver.execute_script("arguments[0].scrollIntoView(true);", yay_button)
-            time.sleep(0.5)
             try:
-                yay_button.click()
-                logger.info("Clicked the YAY! button.")
+                close_button = wait_for(driver, 5, EC.element_to_be_clickable, 'coupon_popup_close', required=False)
+                close_button.click()
+                logger.info("Closed the coupon popup.")
             except Exception as e:
-                logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-                driver.execute_script("arguments[0].click();", yay_button)
-                logger.info("Clicked the YAY! button using JavaScript.")
+                logger.warning(f"Could not close the coupon popup: {e}")
+        try:
+            actions.click(driver, 'coupon_yay', 3, label='yay', required=False)
+            logger.info("Clicked the YAY! button.")
         except TimeoutException:
             logger.info("YAY! button did not appear. Proceeding to 'Proceed to Pay'.")
-        proceed_to_pay_button_xpath = "//button[contains(@class, '_4dnMB') and text()='Proceed to Pay']"
-        proceed_to_pay_button = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, proceed_to_pay_button_xpath))
-        )
-        logger.info("Proceed to Pay button found.")
-        driver.execute_script("arguments[0].scrollIntoView(true);", proceed_to_pay_button)
-        time.sleep(0.5)
-        try:
-            proceed_to_pay_button.click()
-            logger.info("Clicked the Proceed to Pay button.")
-        except Exception as e:
-            logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-            driver.execute_script("arguments[0].click();", proceed_to_pay_button)
-            logger.info("Clicked the Proceed to Pay button using JavaScript.")
-        payment_method_div_xpath = "//div[@data-testid='pm_si_container' and .//div[contains(text(), 'Swiggy Money')]]"
-        payment_method_div = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, payment_method_div_xpath))
-        )
-        logger.info("Swiggy Money payment method div found.")
-        driver.execute_script("arguments[0].scrollIntoView(true);", payment_method_div)
-        time.sleep(0.5)
-        try:
-            payment_method_div.click()
-            logger.info("Clicked the Swiggy Money payment method div.")
-        except Exception as e:
-            logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-            driver.execute_script("arguments[0].click();", payment_method_div)
-            logger.info("Clicked the Swiggy Money payment method div using JavaScript.")
-        pay_button_xpath = "//button[@data-testid='pm_si_pay_btn' and contains(text(), 'Pay')]"
-        pay_button = WebDriverWait(driver, 7).until(
-            EC.element_to_be_clickable((By.XPATH, pay_button_xpath))
-        )
-        logger.info("'Pay' button found.")
-        driver.execute_script("arguments[0].scrollIntoView(true);", pay_button)
-        time.sleep(0.5)
-        try:
-            pay_button.click()
-            logger.info("Clicked the 'Pay' button.")
-        except Exception as e:
-            logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
-            driver.execute_script("arguments[0].click();", pay_button)
-            logger.info("Clicked the 'Pay' button using JavaScript.")
+    except Exception as e:
+        log_checkout_error(driver)
+        raise e
+
+@metrics.timed_stage('payment_page')
+def open_payment_page(driver):
+    try:
+        actions.click(driver, 'proceed_to_pay', 7)
+        logger.info("Clicked the Proceed to Pay button.")
+        jobs.update_stage('paying')
+    except Exception as e:
+        log_checkout_error(driver)
+        raise e
+
+@metrics.timed_stage('pay')
+def pay_with_swiggy_money(driver):
+    try:
+        actions.click(driver, 'swiggy_money', 7, label='payment_method', verify='pay_button')
+        logger.info("Clicked the Swiggy Money payment method div.")
+        actions.click(driver, 'pay_button', 7, label='pay')
+        logger.info("Clicked the 'Pay' button.")
         logger.info("Order placed successfully.")
-        restart_selenium()
     except Exception as e:
-        logger.error("An error occurred during checkout:")
-        logger.error(traceback.format_exc())
-        driver.save_screenshot("checkout_error.png")
-        logger.info("Screenshot saved as checkout_error.png.")
+        log_checkout_error(driver)
         raise e
 
-def initialize_selenium():
-    global driver
-    options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
-    profile_path = os.path.join(os.getcwd(), 'chrome_profile')
-    options.add_argument(f"--user-data-dir={profile_path}")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    driver = webdriver.Chrome(options=options)
+def refresh_menu(restaurant_name):
     try:
+        with driver_pool.leased_driver(timeout=1, is_clean=lambda error: True) as driver:
+            if not open_cached_restaurant(driver, restaurant_name):
+                logger.info(f"No menu URL for '{restaurant_name}' yet. Will snapshot its menu after an order.")
+                return None
+            return menu_index.capture_menu(driver)
+    except queue.Empty:
+        logger.info(f"No idle browser to snapshot the menu of '{restaurant_name}'. Will retry later.")
+        return None
+
+_snapshot_locks = {}
+_snapshot_locks_guard = threading.Lock()
+
+def snapshot_menu(driver, restaurant_name):
+    if not open_cached_restaurant(driver, restaurant_name):
+        open_restaurant_via_search(driver, restaurant_name)
+    items = menu_index.capture_menu(driver)
+    menu_index.save_menu(restaurant_name, items)
+    return items
+
+def recent_menu_items(restaurant_name):
+    entry = menu_index.get_menu(restaurant_name, QUOTE_SNAPSHOT_MAX_AGE)
+    if entry is not None:
+        return entry['items'], 'snapshot'
+    with _snapshot_locks_guard:
+        restaurant_lock = _snapshot_locks.setdefault(restaurant_name, threading.Lock())
+    with restaurant_lock:
+        entry = menu_index.get_menu(restaurant_name, QUOTE_SNAPSHOT_MAX_AGE)
+        if entry is not None:
+            return entry['items'], 'snapshot'
+        with driver_pool.leased_driver(timeout=QUOTE_LEASE_TIMEOUT, is_clean=lambda error: True) as driver:
+            return snapshot_menu(driver, restaurant_name), 'live'
+
+@metrics.timed_stage('quote')
+def quote_dish(dish_name, restaurant_name, quantity):
+    items, source = recent_menu_items(restaurant_name)
+    item = menu_index.match_dish(items, dish_name)
+    price = item['price'] if item else None
+    subtotal = round(price * quantity, 2) if price is not None else None
+    best_coupon = None
+    cached_coupons = coupon_cache.get_coupons(restaurant_name, subtotal) if subtotal else None
+    if cached_coupons:
+        ranked = coupon_cache.order_candidates(restaurant_name, subtotal, coupons.rank_coupons(cached_coupons, subtotal))
+        if ranked:
+            best_coupon = {key: ranked[0][key] for key in ('code', 'description', 'saving')}
+    return {
+        "dish": dish_name,
+        "restaurant": restaurant_name,
+        "quantity": quantity,
+        "available": bool(item and item.get('available', True)),
+        "price": price,
+        "subtotal": subtotal,
+        "best_coupon": best_coupon,
+        "estimated_total": round(subtotal - (best_coupon['saving'] if best_coupon else 0), 2) if subtotal is not None else None,
+        "source": source,
+        "quoted_at": time.time(),
+    }
+
+@metrics.timed_stage('driver_start')
+def initialize_selenium(profile_path):
+    driver = launch_profile.launch_driver(profile_path)
+    try:
+        session_store.rehydrate(driver, new_driver=True)
         driver.get(SWIGGY_URL)
         logger.info(f"Navigated to {SWIGGY_URL}.")
-        time.sleep(2)
+        waits.settle_page(driver, fallback=2)
         if is_logged_in(driver):
             logger.info("User is already logged in.")
         else:
             logger.info("User is not logged in. Proceeding to login.")
-            if perform_login(driver):
+            if ensure_session(driver):
                 logger.info("Login successful.")
             else:
                 logger.error("Failed to log in.")
-                return False
+                driver.quit()
+                return None
         select_address(driver)
-        return True
+        return driver
     except Exception as e:
         logger.error(f"An unexpected error occurred during initialization: {e}")
-        return False
+        driver.quit()
+        return None
 
-def restart_selenium():
-    global driver
-    logger.info("Restarting Selenium WebDriver for the next order.")
+def parse_items(data):
+    if not isinstance(data, dict):
+        raise ValueError("The request body must be a JSON object.")
+    if 'items' in data:
+        raw_items = data['items']
+    elif 'dish' in data:
+        raw_items = [{"dish": data['dish'], "quantity": data.get('quantity', 1)}]
+    else:
+        raise ValueError("Please provide a dish name or a list of items.")
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError("items must be a non-empty list.")
+    items = []
+    for raw_item in raw_items:
+        if not isinstance(raw_item, dict) or not isinstance(raw_item.get('dish'), str) or not raw_item['dish'].strip():
+            raise ValueError("Each item needs a dish name.")
+        quantity = raw_item.get('quantity', 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or not 1 <= quantity <= MAX_QUANTITY:
+            raise ValueError(f"quantity must be a whole number between 1 and {MAX_QUANTITY}.")
+        items.append({"dish": raw_item['dish'].strip(), "quantity": quantity})
+    return items
+
+def describe_items(items):
+    return ', '.join(f"{item['quantity']} x {item['dish']}" for item in items)
+
+def process_order(payload):
+    metrics.start_trace(jobs.current_job_id() or uuid.uuid4().hex)
+    status = 'failed'
+    job_id = jobs.current_job_id()
     try:
-        driver.quit()
-        logger.info("Browser closed.")
-    except Exception as e:
-        logger.warning(f"Error while closing the driver: {e}")
-    initialize_selenium()
+        checkpoint = order_checkpoints.get_checkpoint(job_id) if job_id else None
+        if checkpoint is None:
+            checkpoint = new_checkpoint(payload['items'])
+            save_progress(checkpoint)
+        if checkpoint['pending']:
+            # Until a restaurant page is open the cart is untouched, so a failure there keeps the browser.
+            with driver_pool.leased_driver(is_clean=lambda error: checkpoint['stage'] is None) as driver:
+                place_order(driver, checkpoint)
+        else:
+            logger.info(f"Order {job_id} was already placed at every restaurant before it was resumed.")
+        status = 'placed'
+        if job_id:
+            order_checkpoints.discard(job_id)
+    except queue.Empty:
+        raise Exception("No browser became available in time. Please try again shortly.")
+    finally:
+        metrics.finish_trace(status)
 
 @app.route('/order', methods=['POST'])
 def order_food():
-    global driver
     data = request.get_json()
-    if not data or 'dish' not in data:
+    if not data:
         return jsonify({"error": "Please provide a dish name."}), 400
-    dish = data['dish']
-    logger.info(f"Received order request for dish: {dish}")
     try:
-        search_restaurant(driver, dish)
-        return jsonify({"message": f"Order placed for {dish}."}), 200
+        items = parse_items(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    callback_url = data.get('callback_url')
+    if callback_url not in (None, '') and (not isinstance(callback_url, str) or not callback_url.startswith(('http://', 'https://'))):
+        return jsonify({"error": "callback_url must be an http(s) URL."}), 400
+    if jobs.is_stopping():
+        return jsonify({"error": "The service is restarting. Please try again shortly."}), 503
+    summary = describe_items(items)
+    logger.info(f"Received order request for: {summary}")
+    unknown_dishes = find_unknown_dishes(items)
+    if unknown_dishes:
+        return jsonify({
+            "error": ' '.join(unknown_dish_message(entry['dish'], entry['suggestions']) for entry in unknown_dishes),
+            "unknown_dishes": unknown_dishes,
+        }), 404
+    try:
+        group_items(items)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        job_id = jobs.submit_job({"items": items}, callback_url=callback_url)
+    except queue.Full:
+        logger.error("Order queue is full.")
+        return jsonify({"error": "Too many orders in progress. Please try again shortly."}), 503
+    return jsonify({
+        "message": f"Order accepted for {summary}.",
+        "job_id": job_id,
+        "status_url": f"/order/{job_id}",
+    }), 202
+
+@app.route('/order/<job_id>', methods=['GET'])
+def order_status(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"No order found with id {job_id}."}), 404
+    checkpoint = order_checkpoints.get_checkpoint(job_id)
+    if checkpoint is not None:
+        job['checkpoint'] = {key: checkpoint[key] for key in ('placed', 'restaurant', 'stage')}
+    return jsonify(job), 200
+
+@app.route('/order/<job_id>/resume', methods=['POST'])
+def resume_order(job_id):
+    if jobs.is_stopping():
+        return jsonify({"error": "The service is restarting. Please try again shortly."}), 503
+    checkpoint = order_checkpoints.get_checkpoint(job_id)
+    if checkpoint is None:
+        return jsonify({"error": f"No saved progress for order {job_id}."}), 404
+    try:
+        resumed = jobs.resume_job(job_id, {"items": checkpoint['items']})
+    except queue.Full:
+        logger.error("Order queue is full.")
+        return jsonify({"error": "Too many orders in progress. Please try again shortly."}), 503
+    if not resumed:
+        return jsonify({"error": f"Order {job_id} is still in progress."}), 409
+    return jsonify({
+        "message": f"Resuming order {job_id}.",
+        "job_id": job_id,
+        "status_url": f"/order/{job_id}",
+    }), 202
+
+@app.route('/quote', methods=['GET'])
+def quote():
+    dish = request.args.get('dish', '').strip()
+    if not dish:
+        return jsonify({"error": "Please provide a dish name."}), 400
+    try:
+        quantity = int(request.args.get('quantity', 1))
+    except ValueError:
+        quantity = 0
+    if not 1 <= quantity <= MAX_QUANTITY:
+        return jsonify({"error": f"quantity must be a whole number between 1 and {MAX_QUANTITY}."}), 400
+    try:
+        dish_name, restaurant_name = resolve_dish(dish)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 404
+    cached_quote = quote_cache.get_quote(dish_name, quantity)
+    if cached_quote is not None:
+        return jsonify(cached_quote), 200
+    try:
+        dish_quote = quote_dish(dish_name, restaurant_name, quantity)
+    except queue.Empty:
+        logger.error("No browser available to quote the dish.")
+        return jsonify({"error": "All browsers are busy. Please try again shortly."}), 503
+    except Exception as e:
+        logger.error(f"Could not quote '{dish_name}': {e}")
+        return jsonify({"error": f"Could not check '{dish_name}' right now."}), 500
+    quote_cache.save_quote(dish_name, quantity, dish_quote)
+    return jsonify(dish_quote), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+_services = {}
+_services_lock = threading.Lock()
+
+def create_app():
+    with _services_lock:
+        if _services:
+            return app
+        driver_pool.prune_worker_profiles()
+        profiles_dir = driver_pool.worker_profiles_dir(os.getpid())
+        if not driver_pool.init_pool(initialize_selenium, profiles_dir=profiles_dir):
+            shutil.rmtree(profiles_dir, ignore_errors=True)
+            raise RuntimeError("Failed to initialize Selenium WebDriver.")
+        jobs.start_workers(process_order, driver_pool.POOL_SIZE)
+        _services['profiles_dir'] = profiles_dir
+        _services['catalogue_watcher'] = catalogue.watch_catalogue(reload_catalogue)
+        _services['menu_refresher'] = menu_index.start_refresher(refresh_menu)
+        _services['metrics_snapshots'] = metrics.start_snapshots()
+        logger.info(f"Worker {os.getpid()} is ready with {driver_pool.POOL_SIZE} browser(s).")
+    return app
+
+def _shutdown_step(name, step, *args):
+    try:
+        step(*args)
     except Exception as e:
-        logger.error(f"An error occurred while processing the order: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.error(f"Shutdown step '{name}' failed: {e}")
+
+def _save_unstarted_jobs(timeout):
+    for job_id, payload in jobs.stop_workers(timeout):
+        try:
+            # A resumed job is queued with the checkpoint it already has; replacing it would
+            # forget which restaurants were paid for.
+            if order_checkpoints.get_checkpoint(job_id) is None:
+                order_checkpoints.save_checkpoint(job_id, new_checkpoint(payload['items']))
+        except Exception as e:
+            logger.warning(f"Could not save job {job_id} for resuming: {e}")
+
+def shutdown_app(timeout=DRAIN_TIMEOUT):
+    with _services_lock:
+        if not _services:
+            return
+        logger.info(f"Worker {os.getpid()} is draining. Waiting up to {timeout}s for running orders.")
+        # Run every step even if an earlier one fails, so browsers are never left running.
+        _shutdown_step('catalogue_watcher', _services['catalogue_watcher'].set)
+        _shutdown_step('menu_refresher', _services['menu_refresher'].set)
+        _shutdown_step('drain', _save_unstarted_jobs, timeout)
+        _shutdown_step('driver_pool', driver_pool.shutdown_pool)
+        _shutdown_step('selector_stats', selector_registry.flush)
+        _shutdown_step('metrics_snapshots', _services['metrics_snapshots'].set)
+        _shutdown_step('metrics', metrics.write_snapshot)
+        shutil.rmtree(_services['profiles_dir'], ignore_errors=True)
+        _services.clear()
+        logger.info(f"Worker {os.getpid()} shut down.")
 
 if __name__ == "__main__":
-    if initialize_selenium():
-        app.run(host='0.0.0.0', port=8000)
-    else:
-        logger.error("Failed to initialize Selenium WebDriver.")
+    try:
+        create_app()
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        app.run(host='0.0.0.0', port=8000, threaded=True)
+    finally:
+        shutdown_app()
@@ -0,0 +1,46 @@
+import time
+import logging
+import threading
+
+UNAVAILABLE_TTL = 15 * 60
+AVAILABLE_TTL = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_restaurants = {}
+
+
+def _entry(restaurant_name, ttl):
+    entry = _restaurants.get(restaurant_name)
+    if entry is None or time.time() - entry['seen_at'] > ttl:
+        return None
+    return entry
+
+
+def is_unavailable(restaurant_name):
+    with _lock:
+        entry = _entry(restaurant_name, UNAVAILABLE_TTL)
+        return entry is not None and not entry['available']
+
+
+def is_recently_available(restaurant_name):
+    with _lock:
+        entry = _entry(restaurant_name, AVAILABLE_TTL)
+        return entry is not None and entry['available']
+
+
+def mark_unavailable(restaurant_name):
+    with _lock:
+        _restaurants[restaurant_name] = {'available': False, 'seen_at': time.time()}
+    logger.info(f"Skipping '{restaurant_name}' for the next {UNAVAILABLE_TTL // 60} minutes.")
+
+
+def mark_available(restaurant_name):
+    with _lock:
+        _restaurants[restaurant_name] = {'available': True, 'seen_at': time.time()}
+
+
+def clear():
+    with _lock:
+        _restaurants.clear()
@@ -0,0 +1,79 @@
+import os
+import re
+import glob
+import timeit
+import argparse
+
+from bs4 import BeautifulSoup
+
+import coupons
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def legacy_valid_coupons(coupon_popup_html):
+    soup = BeautifulSoup(coupon_popup_html, 'html.parser')
+    card_keywords = ['card', 'credit', 'debit', 'bank', 'upi', 'payment', 'amazon pay', 'wallet', 'flash', 'cred', 'simpl']
+    available_coupons_header = soup.find('h2', string='Available Coupons')
+    if not available_coupons_header:
+        return None
+    available_coupons_section = available_coupons_header.find_next_sibling('div')
+    valid_coupons = []
+    for coupon in available_coupons_section.find_all('div', class_='xKU6G'):
+        coupon_code_tag = coupon.find('span', class_='_3vb2y')
+        if not coupon_code_tag:
+            continue
+        description_tag = coupon.find('div', class_='BT4Uo')
+        description = description_tag.get_text(strip=True) if description_tag else ''
+        terms_tag = coupon.find('div', class_='_3J1AT')
+        terms = terms_tag.get_text(strip=True) if terms_tag else ''
+        combined_text = f"{description} {terms}".lower()
+        if any(keyword in combined_text for keyword in card_keywords):
+            continue
+        valid_coupons.append({'code': coupon_code_tag.get_text(strip=True), 'description': description, 'terms': terms})
+
+    def extract_discount(coupon):
+        matches = re.findall(r'₹\d+', coupon['description'])
+        return int(matches[0].replace('₹', '')) if matches else 0
+
+    valid_coupons.sort(key=extract_discount, reverse=True)
+    return sorted(coupon['code'] for coupon in valid_coupons)
+
+
+def engine_valid_coupons(coupon_popup_html, parser):
+    available_coupons = parser(coupon_popup_html)
+    if available_coupons is None:
+        return None
+    valid_coupons = [coupon for coupon in available_coupons if coupons.is_app_coupon(coupon)]
+    coupons.rank_coupons(valid_coupons, None)
+    return sorted(coupon['code'] for coupon in valid_coupons)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark coupon extraction on saved coupon popup HTML.")
+    parser.add_argument('fixtures', nargs='*', help="Saved coupon popup HTML files. Defaults to benchmarks/fixtures.")
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+    paths = args.fixtures or sorted(glob.glob(os.path.join(FIXTURES_DIR, 'coupon_popup*.html')))
+    candidates = [('legacy html.parser', legacy_valid_coupons),
+                  ('engine html.parser', lambda html: engine_valid_coupons(html, coupons._parse_with_soup))]
+    if coupons.lxml_html is not None:
+        candidates.append(('engine lxml', lambda html: engine_valid_coupons(html, coupons._parse_with_lxml)))
+    else:
+        print("lxml is not installed, skipping the lxml parser.")
+    for path in paths:
+        with open(path, encoding='utf-8') as fixture_file:
+            coupon_popup_html = fixture_file.read()
+        expected = legacy_valid_coupons(coupon_popup_html)
+        print(f"{os.path.basename(path)} ({len(expected or [])} app coupons)")
+        baseline = None
+        for name, choose in candidates:
+            chosen = choose(coupon_popup_html)
+            seconds = min(timeit.repeat(lambda: choose(coupon_popup_html), number=args.number, repeat=3)) / args.number
+            baseline = baseline or seconds
+            status = 'ok' if chosen == expected else 'MISMATCH'
+            print(f"  {name:<20} {seconds * 1000:8.2f} ms  {baseline / seconds:5.1f}x  {status}")
+
+
+if __name__ == '__main__':
+    main()
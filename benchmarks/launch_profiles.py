@@ -0,0 +1,81 @@
+import os
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+
+import launch_profile
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def process_tree_rss_mb(root_pid):
+    children = {}
+    rss = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/status') as status_file:
+                fields = dict(line.split(':', 1) for line in status_file if ':' in line)
+        except OSError:
+            continue
+        pid = int(entry)
+        children.setdefault(int(fields.get('PPid', '0').strip()), []).append(pid)
+        rss[pid] = int(fields.get('VmRSS', '0 kB').split()[0])
+    total_kb = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        total_kb += rss.get(pid, 0)
+        pending.extend(children.get(pid, []))
+    return total_kb / 1024
+
+
+def run_profile(profile, urls, runs):
+    profile_dir = tempfile.mkdtemp(prefix=f'bench_{profile}_')
+    started = time.monotonic()
+    driver = launch_profile.launch_driver(profile_dir, profile)
+    launch_seconds = time.monotonic() - started
+    page_seconds = []
+    try:
+        for _ in range(runs):
+            order_started = time.monotonic()
+            for url in urls:
+                driver.get(url)
+            page_seconds.append(time.monotonic() - order_started)
+        memory_mb = process_tree_rss_mb(driver.service.process.pid)
+    finally:
+        driver.quit()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    return {
+        'profile': profile,
+        'launch_s': launch_seconds,
+        'pages_s': statistics.median(page_seconds),
+        'memory_mb': memory_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Chrome launch profiles by launch time, page load time and memory.")
+    parser.add_argument('--profiles', nargs='+', default=['desktop', 'server'])
+    parser.add_argument('--url', action='append', dest='urls',
+                        help="Page to load for each simulated order. Repeat for several pages.")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    urls = args.urls or ['https://www.swiggy.com']
+    results = [run_profile(profile, urls, args.runs) for profile in args.profiles]
+    baseline = results[0]
+    print(f"{'profile':<10} {'launch s':>9} {'pages s':>9} {'memory MB':>10}   vs {baseline['profile']}")
+    for result in results:
+        pages_delta = (result['pages_s'] / baseline['pages_s'] - 1) * 100
+        memory_delta = (result['memory_mb'] / baseline['memory_mb'] - 1) * 100 if baseline['memory_mb'] else 0
+        print(f"{result['profile']:<10} {result['launch_s']:>9.2f} {result['pages_s']:>9.2f} "
+              f"{result['memory_mb']:>10.0f}   pages {pages_delta:+.0f}%, memory {memory_delta:+.0f}%")
+
+
+if __name__ == '__main__':
+    main()
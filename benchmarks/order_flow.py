@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+
+import api
+import actions
+import metrics
+import coupon_cache
+import menu_index
+import session_store
+import restaurant_cache
+import selector_registry
+import cart_lock
+from benchmarks import replay_server
+
+logger = logging.getLogger(__name__)
+
+
+def parse_item(text):
+    dish, _, quantity = text.rpartition(':')
+    if dish and quantity.isdigit():
+        return {'dish': dish, 'quantity': int(quantity)}
+    return {'dish': text, 'quantity': 1}
+
+
+def stage_seconds(trace):
+    seconds = {'total': trace['seconds']}
+    for event in trace['stages']:
+        seconds[event['stage']] = seconds.get(event['stage'], 0) + event['seconds']
+    return seconds
+
+
+def count_round_trips(driver):
+    counter = {'round_trips': 0}
+    execute = driver.execute
+
+    def counted_execute(driver_command, params=None):
+        counter['round_trips'] += 1
+        return execute(driver_command, params)
+
+    driver.execute = counted_execute
+    return counter
+
+
+def run_orders(driver, items, runs, warmup, cold):
+    counter = count_round_trips(driver)
+    traces = []
+    for run in range(warmup + runs):
+        if cold:
+            restaurant_cache.clear()
+            coupon_cache.clear()
+        metrics.start_trace(f'replay_{run}')
+        status = 'failed'
+        round_trips = counter['round_trips']
+        try:
+            api.place_order(driver, api.new_checkpoint(items))
+            status = 'placed'
+        finally:
+            trace = metrics.finish_trace(status)
+        trace['round_trips'] = counter['round_trips'] - round_trips
+        if run >= warmup:
+            traces.append(trace)
+    return traces
+
+
+def summarise(traces):
+    runs = [stage_seconds(trace) for trace in traces]
+    stages = sorted({stage for run in runs for stage in run}, key=lambda stage: (stage == 'total', stage))
+    return {stage: statistics.median(run.get(stage, 0) for run in runs) for stage in stages}
+
+
+def report(summary, baseline, threshold):
+    regressions = []
+    header = f"{'stage':<20} {'median s':>9}"
+    if baseline:
+        header += f" {'baseline s':>11} {'change':>8}"
+    print(header)
+    for stage, seconds in summary.items():
+        line = f"{stage:<20} {seconds:>9.3f}"
+        if baseline and stage in baseline:
+            change = (seconds / baseline[stage] - 1) if baseline[stage] else 0
+            line += f" {baseline[stage]:>11.3f} {change * 100:>+7.0f}%"
+            if change > threshold:
+                line += "  REGRESSION"
+                regressions.append(stage)
+        print(line)
+    return regressions
+
+
+def report_round_trips(round_trips, baseline, threshold):
+    line = f"{'webdriver calls':<20} {round_trips:>9.0f}"
+    regressions = []
+    if baseline:
+        change = round_trips / baseline - 1
+        line += f" {baseline:>11.0f} {change * 100:>+7.0f}%"
+        if change > threshold:
+            line += "  REGRESSION"
+            regressions.append('webdriver calls')
+    print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the api.py order flow against the offline replay site and time each stage.")
+    parser.add_argument('--item', action='append', dest='items', type=parse_item,
+                        help="Dish to order as 'name' or 'name:quantity'. Repeat for several items.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--cold', action='store_true',
+                        help="Clear the menu URL and coupon caches before every order.")
+    parser.add_argument('--baseline', help="JSON file with stage timings to compare against.")
+    parser.add_argument('--save-baseline', help="Write the stage timings of this run to a JSON file.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown against the baseline that counts as a regression, 0.2 is 20%%.")
+    parser.add_argument('--action-mode', choices=('script', 'webdriver'), default=actions.ACTION_MODE,
+                        help="Click with one injected script per action, or with separate WebDriver calls as before.")
+    parser.add_argument('--verbose', action='store_true')
+    replay_server.add_arguments(parser)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    items = args.items or [{'dish': 'Margherita Pizza', 'quantity': 1}]
+    actions.ACTION_MODE = args.action_mode
+
+    work_dir = tempfile.mkdtemp(prefix='replay_bench_')
+    restaurant_cache.RESTAURANT_URLS_PATH = os.path.join(work_dir, 'restaurant_urls.json')
+    session_store.SESSION_PATH = os.path.join(work_dir, 'login_cookies.json')
+    menu_index.MENU_INDEX_PATH = os.path.join(work_dir, 'menu_index.json')
+    selector_registry.STATS_PATH = os.path.join(work_dir, 'selector_stats.json')
+    cart_lock.CART_LOCK_PATH = os.path.join(work_dir, 'swiggy_cart')
+    server = replay_server.start_server(
+        latency_ms=args.latency_ms,
+        render_delay_ms=args.render_delay_ms,
+        popup_rate=args.popup_rate,
+        popups=args.popups,
+        rejected_coupons=args.rejected_coupons,
+    )
+    api.SWIGGY_URL = server.url
+    driver = None
+    try:
+        driver = api.initialize_selenium(os.path.join(work_dir, 'chrome_profile'))
+        if driver is None:
+            print("Could not start Chrome against the replay site.")
+            return 1
+        traces = run_orders(driver, items, args.runs, args.warmup, args.cold)
+    finally:
+        if driver is not None:
+            driver.quit()
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = summarise(traces)
+    round_trips = statistics.median(trace['round_trips'] for trace in traces)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = report(summary, baseline and baseline['stages'], args.threshold)
+    regressions += report_round_trips(round_trips, baseline and baseline.get('round_trips'), args.threshold)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({'items': items, 'runs': args.runs, 'action_mode': args.action_mode,
+                       'round_trips': round_trips, 'stages': summary}, baseline_file, indent=2)
+        print(f"Saved stage timings to {args.save_baseline}.")
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+var REPLAY = window.REPLAY_CONFIG;
+
+function later(callback) {
+    setTimeout(callback, REPLAY.render_delay_ms);
+}
+
+function show(element) {
+    element.style.display = '';
+}
+
+function hide(element) {
+    element.style.display = 'none';
+}
+
+function byId(id) {
+    return document.getElementById(id);
+}
+
+function loadCart() {
+    return JSON.parse(localStorage.getItem('replay_cart') || '{}');
+}
+
+function saveCart(cart) {
+    localStorage.setItem('replay_cart', JSON.stringify(cart));
+}
+
+function cartTotal() {
+    var cart = loadCart();
+    var total = 0;
+    for (var dish in cart) {
+        total += cart[dish].quantity * cart[dish].price;
+    }
+    return total;
+}
+
+function pickPopup() {
+    if (!REPLAY.popups.length || Math.random() >= REPLAY.popup_rate) {
+        return null;
+    }
+    return REPLAY.popups[Math.floor(Math.random() * REPLAY.popups.length)];
+}
@@ -0,0 +1,143 @@
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import catalogue
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replay_pages')
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+POPUPS = ('continue', 'start_afresh', 'customize', 'modal')
+COUPON_DISCOUNT = 75
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def dish_price(dish):
+    return 150 + sum(map(ord, dish)) % 35 * 10
+
+
+def build_restaurants(restaurant_dict):
+    return {
+        slugify(name): {
+            'name': name,
+            'slug': slugify(name),
+            'dishes': [{'name': dish, 'price': dish_price(dish)} for dish in dishes],
+        }
+        for name, dishes in restaurant_dict.items()
+    }
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as page_file:
+        return page_file.read()
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        replay = self.server.replay
+        time.sleep(replay['latency_ms'] / 1000)
+        path = unquote(urlsplit(self.path).path).rstrip('/') or '/'
+        if path == '/replay.js':
+            return self._send(_read(os.path.join(PAGES_DIR, 'replay.js')), 'application/javascript')
+        if path.startswith('/restaurants/'):
+            restaurant = replay['restaurants'].get(path[len('/restaurants/'):])
+            if restaurant is None:
+                return self._send_not_found()
+            return self._send_page('menu', restaurant=restaurant)
+        pages = {'/': 'home', '/search': 'search', '/checkout': 'checkout', '/payment': 'payment'}
+        if path not in pages:
+            return self._send_not_found()
+        return self._send_page(pages[path])
+
+    def _send_page(self, page, restaurant=None):
+        replay = self.server.replay
+        config = {
+            'render_delay_ms': replay['render_delay_ms'],
+            'popup_rate': replay['popup_rate'],
+            'popups': replay['popups'],
+            'rejected_coupons': replay['rejected_coupons'],
+            'coupon_discount': COUPON_DISCOUNT,
+            'restaurants': [{'name': entry['name'], 'slug': entry['slug']} for entry in replay['restaurants'].values()],
+            'restaurant': restaurant,
+        }
+        body = _read(os.path.join(PAGES_DIR, f'{page}.html'))
+        body = body.replace('{{config}}', json.dumps(config).replace('</', '<\\/'))
+        body = body.replace('{{coupon_popup}}', replay['coupon_popup'])
+        self._send(body, 'text/html; charset=utf-8')
+
+    def _send_not_found(self):
+        self._send('<h1>Not found</h1>', 'text/html; charset=utf-8', status=404)
+
+    def _send(self, body, content_type, status=200):
+        encoded = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(encoded)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def start_server(host='127.0.0.1', port=0, latency_ms=0, render_delay_ms=0, popup_rate=0.0, popups=POPUPS,
+                 rejected_coupons=(), catalogue_path=catalogue.CATALOGUE_PATH,
+                 coupon_popup_path=os.path.join(FIXTURES_DIR, 'coupon_popup.html')):
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.replay = {
+        'latency_ms': latency_ms,
+        'render_delay_ms': render_delay_ms,
+        'popup_rate': popup_rate,
+        'popups': list(popups),
+        'rejected_coupons': list(rejected_coupons),
+        'restaurants': build_restaurants(catalogue.load_catalogue(catalogue_path)),
+        'coupon_popup': _read(coupon_popup_path),
+    }
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name='replay-server', daemon=True).start()
+    logger.info(f"Replay server listening on {server.url}.")
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency-ms', type=int, default=50, help="Delay before every response.")
+    parser.add_argument('--render-delay-ms', type=int, default=100,
+                        help="Delay before the pages render results of a click or keystroke.")
+    parser.add_argument('--popup-rate', type=float, default=0.0,
+                        help="Chance that adding a dish opens one of the menu pop-ups.")
+    parser.add_argument('--popups', nargs='+', choices=POPUPS, default=list(POPUPS))
+    parser.add_argument('--reject-coupon', action='append', dest='rejected_coupons', default=[],
+                        help="Coupon code the checkout page should refuse. Repeat for several codes.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Swiggy pages locally for offline runs of the order flow.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = start_server(args.host, args.port, args.latency_ms, args.render_delay_ms, args.popup_rate,
+                          args.popups, args.rejected_coupons)
+    print(f"Serving the replay site on {server.url}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import os
+import logging
+from contextlib import contextmanager
+
+import file_store
+
+CART_LOCK_PATH = os.path.join(os.getcwd(), 'swiggy_cart')
+CART_LOCK_TIMEOUT = 15 * 60
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def holding_cart(owner, timeout=CART_LOCK_TIMEOUT):
+    # Every browser is logged in to the same Swiggy account, so they all share one cart on Swiggy's side.
+    # Only one order, in any worker process, may fill and check out that cart at a time.
+    logger.info(f"Waiting for the account cart for order {owner}.")
+    acquired = False
+    try:
+        with file_store.locked(CART_LOCK_PATH, timeout) as lock_file:
+            acquired = True
+            lock_file.seek(0)
+            previous_owner = lock_file.read().strip() or None
+            lock_file.truncate(0)
+            lock_file.write(owner)
+            lock_file.flush()
+            logger.info(f"Order {owner} holds the account cart.")
+            yield previous_owner
+    except TimeoutError:
+        if acquired:
+            raise
+        raise Exception(f"The account cart was busy with another order for {timeout}s. Please resume the order later.")
+    logger.info(f"Order {owner} released the account cart.")
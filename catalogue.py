@@ -0,0 +1,101 @@
+import os
+import csv
+import json
+import sqlite3
+import logging
+import threading
+
+CATALOGUE_PATH = os.environ.get(
+    'SWIGGY_CATALOGUE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'restaurants.json')
+)
+CATALOGUE_TABLE = 'dishes'
+WATCH_INTERVAL = 5
+
+logger = logging.getLogger(__name__)
+
+
+def _load_json(path):
+    with open(path, encoding='utf-8') as catalogue_file:
+        data = json.load(catalogue_file)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain an object mapping restaurant names to dish lists.")
+    return {str(restaurant): [str(dish) for dish in dishes] for restaurant, dishes in data.items()}
+
+
+def _add(catalogue, restaurant, dish):
+    restaurant = (restaurant or '').strip()
+    dish = (dish or '').strip()
+    if restaurant and dish:
+        catalogue.setdefault(restaurant, []).append(dish)
+
+
+def _load_csv(path):
+    catalogue = {}
+    with open(path, newline='', encoding='utf-8') as catalogue_file:
+        for row in csv.DictReader(catalogue_file):
+            _add(catalogue, row.get('restaurant'), row.get('dish'))
+    return catalogue
+
+
+def _load_sqlite(path):
+    catalogue = {}
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        for restaurant, dish in connection.execute(f"SELECT restaurant, dish FROM {CATALOGUE_TABLE}"):
+            _add(catalogue, restaurant, dish)
+    finally:
+        connection.close()
+    return catalogue
+
+
+_LOADERS = {
+    '.json': _load_json,
+    '.csv': _load_csv,
+    '.sqlite': _load_sqlite,
+    '.sqlite3': _load_sqlite,
+    '.db': _load_sqlite,
+}
+
+
+def load_catalogue(path=CATALOGUE_PATH):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _LOADERS:
+        raise ValueError(f"Unsupported catalogue format '{extension}'. Use one of {', '.join(_LOADERS)}.")
+    catalogue = _LOADERS[extension](path)
+    if not catalogue:
+        raise ValueError(f"Catalogue {path} has no dishes.")
+    logger.info(f"Loaded {len(catalogue)} restaurants from {path}.")
+    return catalogue
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch_catalogue(on_change, path=CATALOGUE_PATH, interval=WATCH_INTERVAL):
+    stop_event = threading.Event()
+
+    def watch():
+        try:
+            last_signature = _signature(path)
+        except OSError:
+            last_signature = None
+        while not stop_event.wait(interval):
+            try:
+                signature = _signature(path)
+            except OSError as e:
+                logger.warning(f"Could not read catalogue {path}: {e}")
+                continue
+            if signature == last_signature:
+                continue
+            last_signature = signature
+            try:
+                on_change(load_catalogue(path))
+                logger.info(f"Catalogue {path} reloaded.")
+            except Exception as e:
+                logger.error(f"Keeping the current catalogue, reloading {path} failed: {e}")
+
+    threading.Thread(target=watch, name='catalogue-watcher', daemon=True).start()
+    logger.info(f"Watching {path} for catalogue changes every {interval}s.")
+    return stop_event
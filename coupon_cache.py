@@ -0,0 +1,77 @@
+import time
+import logging
+import threading
+
+COUPON_CACHE_TTL = 30 * 60
+COUPON_OUTCOME_TTL = 6 * 3600
+CART_BUCKET_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_coupons = {}
+_outcomes = {}
+
+
+def _key(restaurant_name, cart_total):
+    bucket = int(cart_total // CART_BUCKET_SIZE) if cart_total is not None else None
+    return restaurant_name, bucket
+
+
+def get_coupons(restaurant_name, cart_total):
+    key = _key(restaurant_name, cart_total)
+    with _lock:
+        entry = _coupons.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['saved_at'] > COUPON_CACHE_TTL:
+            del _coupons[key]
+            return None
+        return list(entry['coupons'])
+
+
+def save_coupons(restaurant_name, cart_total, coupons):
+    with _lock:
+        _coupons[_key(restaurant_name, cart_total)] = {'coupons': list(coupons), 'saved_at': time.time()}
+    logger.info(f"Cached {len(coupons)} coupon(s) for '{restaurant_name}'.")
+
+
+def invalidate(restaurant_name, cart_total):
+    with _lock:
+        if _coupons.pop(_key(restaurant_name, cart_total), None) is not None:
+            logger.info(f"Invalidated cached coupons for '{restaurant_name}'.")
+
+
+def _outcome_entry(key):
+    entry = _outcomes.get(key)
+    if entry is None or time.time() - entry['updated_at'] > COUPON_OUTCOME_TTL:
+        entry = _outcomes[key] = {'accepted': set(), 'rejected': set(), 'updated_at': time.time()}
+    return entry
+
+
+def record_outcome(restaurant_name, cart_total, code, accepted):
+    key = _key(restaurant_name, cart_total)
+    with _lock:
+        entry = _outcome_entry(key)
+        entry['accepted' if accepted else 'rejected'].add(code)
+        entry['updated_at'] = time.time()
+        (entry['rejected'] if accepted else entry['accepted']).discard(code)
+    if not accepted:
+        invalidate(restaurant_name, cart_total)
+
+
+def order_candidates(restaurant_name, cart_total, candidates):
+    with _lock:
+        entry = _outcome_entry(_key(restaurant_name, cart_total))
+        accepted = set(entry['accepted'])
+        rejected = set(entry['rejected'])
+    usable = [candidate for candidate in candidates if candidate['code'] not in rejected]
+    usable.sort(key=lambda candidate: (candidate['saving'], candidate['code'] in accepted), reverse=True)
+    return usable
+
+
+def clear():
+    with _lock:
+        _coupons.clear()
+        _outcomes.clear()
+    logger.info("Cleared all cached coupons.")
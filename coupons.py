@@ -0,0 +1,242 @@
+import re
+import logging
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+CARD_KEYWORDS = ('card', 'credit', 'debit', 'bank', 'upi', 'payment', 'amazon pay', 'wallet', 'flash', 'cred', 'simpl')
+CARD_KEYWORDS_RE = re.compile('|'.join(re.escape(keyword) for keyword in CARD_KEYWORDS), re.IGNORECASE)
+AMOUNT_RE = re.compile(r'₹\s*([\d,]+(?:\.\d+)?)')
+PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%(?:\s*off)?(?:[^₹%]{0,20}?\bup\s*to\s*₹\s*([\d,]+))?', re.IGNORECASE)
+CAP_RE = re.compile(r'\b(?:up\s*to|upto|max(?:imum)?(?:\s*discount)?(?:\s*of)?)\s*₹\s*([\d,]+)', re.IGNORECASE)
+MIN_ORDER_RE = re.compile(
+    r'(?:orders?\s*(?:above|over|of|worth|more\s*than)|min(?:imum|\.)?\s*order(?:\s*value)?(?:\s*of)?|above)\s*₹\s*([\d,]+)',
+    re.IGNORECASE,
+)
+
+COUPON_CLASSES = {
+    'coupon': 'xKU6G',
+    'code': '_3vb2y',
+    'description': 'BT4Uo',
+    'terms': '_3J1AT',
+}
+MAX_COUPON_ATTEMPTS = 3
+SCROLL_SETTLE_MS = 300
+SCROLL_TIMEOUT_MS = 5000
+
+EXTRACT_COUPONS_SCRIPT = """
+var popup = arguments[0];
+var classes = arguments[1];
+var settleMs = arguments[2];
+var timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+var lastHeight = -1;
+var lastChange = Date.now();
+
+function strippedText(element) {
+    if (!element) {
+        return '';
+    }
+    var parts = [];
+    var walker = document.createTreeWalker(element, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        parts.push(walker.currentNode.nodeValue.trim());
+    }
+    return parts.join('');
+}
+
+function extract() {
+    var header = Array.prototype.find.call(popup.querySelectorAll('h2'), function(h2) {
+        return h2.textContent === 'Available Coupons';
+    });
+    if (!header) {
+        return null;
+    }
+    var section = header.nextElementSibling;
+    while (section && section.tagName !== 'DIV') {
+        section = section.nextElementSibling;
+    }
+    var coupons = [];
+    if (!section) {
+        return coupons;
+    }
+    section.querySelectorAll('div.' + classes.coupon).forEach(function(coupon) {
+        var code = coupon.querySelector('span.' + classes.code);
+        if (!code) {
+            return;
+        }
+        coupons.push({
+            code: strippedText(code),
+            description: strippedText(coupon.querySelector('div.' + classes.description)),
+            terms: strippedText(coupon.querySelector('div.' + classes.terms))
+        });
+    });
+    return coupons;
+}
+
+(function poll() {
+    popup.scrollTo(0, popup.scrollHeight);
+    if (popup.scrollHeight !== lastHeight) {
+        lastHeight = popup.scrollHeight;
+        lastChange = Date.now();
+    }
+    if (Date.now() - lastChange >= settleMs || Date.now() - started >= timeoutMs) {
+        done(extract());
+    } else {
+        setTimeout(poll, 50);
+    }
+})();
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def extract_coupons(driver, popup_element):
+    try:
+        coupons = driver.execute_async_script(
+            EXTRACT_COUPONS_SCRIPT, popup_element, COUPON_CLASSES, SCROLL_SETTLE_MS, SCROLL_TIMEOUT_MS
+        )
+        logger.info("Extracted coupons from the popup in a single script call.")
+        return coupons
+    except Exception as e:
+        logger.warning(f"In-browser coupon extraction failed: {e}. Parsing the popup HTML instead.")
+        return parse_coupons(popup_element.get_attribute('innerHTML'))
+
+
+def _class_xpath(tag, class_name):
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+def _stripped_text(element):
+    return ''.join(text.strip() for text in element.itertext())
+
+
+def _parse_with_lxml(popup_html):
+    root = lxml_html.fragment_fromstring(popup_html, create_parent='div')
+    headers = [h2 for h2 in root.iter('h2') if h2.text_content() == 'Available Coupons']
+    if not headers:
+        return None
+    sections = headers[0].itersiblings('div')
+    section = next(sections, None)
+    coupons = []
+    if section is None:
+        return coupons
+    for coupon in section.xpath(_class_xpath('div', COUPON_CLASSES['coupon'])):
+        codes = coupon.xpath(_class_xpath('span', COUPON_CLASSES['code']))
+        if not codes:
+            continue
+        descriptions = coupon.xpath(_class_xpath('div', COUPON_CLASSES['description']))
+        terms = coupon.xpath(_class_xpath('div', COUPON_CLASSES['terms']))
+        coupons.append({
+            'code': _stripped_text(codes[0]),
+            'description': _stripped_text(descriptions[0]) if descriptions else '',
+            'terms': _stripped_text(terms[0]) if terms else '',
+        })
+    return coupons
+
+
+def _parse_with_soup(popup_html):
+    soup = BeautifulSoup(popup_html, 'html.parser')
+    header = soup.find('h2', string='Available Coupons')
+    if not header:
+        return None
+    section = header.find_next_sibling('div')
+    coupons = []
+    if section is None:
+        return coupons
+    for coupon in section.find_all('div', class_=COUPON_CLASSES['coupon']):
+        code = coupon.find('span', class_=COUPON_CLASSES['code'])
+        if not code:
+            continue
+        description = coupon.find('div', class_=COUPON_CLASSES['description'])
+        terms = coupon.find('div', class_=COUPON_CLASSES['terms'])
+        coupons.append({
+            'code': code.get_text(strip=True),
+            'description': description.get_text(strip=True) if description else '',
+            'terms': terms.get_text(strip=True) if terms else '',
+        })
+    return coupons
+
+
+def parse_coupons(popup_html):
+    if lxml_html is not None:
+        return _parse_with_lxml(popup_html)
+    return _parse_with_soup(popup_html)
+
+
+def is_app_coupon(coupon):
+    return not CARD_KEYWORDS_RE.search(f"{coupon['description']} {coupon['terms']}")
+
+
+def parse_amount(text):
+    match = AMOUNT_RE.search(text or '')
+    if not match:
+        return None
+    return float(match.group(1).replace(',', ''))
+
+
+def parse_offer(coupon):
+    description = coupon['description']
+    text = f"{description} {coupon['terms']}"
+    min_order_match = MIN_ORDER_RE.search(text)
+    offer = {
+        'percent': None,
+        'cap': None,
+        'flat': None,
+        'min_order': int(min_order_match.group(1).replace(',', '')) if min_order_match else None,
+    }
+    percent_match = PERCENT_RE.search(description)
+    if percent_match:
+        offer['percent'] = float(percent_match.group(1))
+        cap = percent_match.group(2)
+        if cap is None:
+            cap_match = CAP_RE.search(text)
+            cap = cap_match.group(1) if cap_match else None
+        offer['cap'] = int(cap.replace(',', '')) if cap else None
+        return offer
+    min_order_spans = [match.span(1) for match in MIN_ORDER_RE.finditer(description)]
+    for match in AMOUNT_RE.finditer(description):
+        if not any(start <= match.start(1) < end for start, end in min_order_spans):
+            offer['flat'] = int(float(match.group(1).replace(',', '')))
+            break
+    return offer
+
+
+def effective_discount(coupon, cart_total):
+    offer = parse_offer(coupon)
+    if cart_total is not None and offer['min_order'] is not None and cart_total < offer['min_order']:
+        return 0
+    if offer['percent'] is not None:
+        if cart_total is None:
+            if offer['cap'] is not None:
+                return offer['cap']
+            # The coupon only applies above its minimum order, so it saves at least its share of that.
+            return offer['min_order'] * offer['percent'] / 100 if offer['min_order'] else 0
+        saving = cart_total * offer['percent'] / 100
+        return min(saving, offer['cap']) if offer['cap'] is not None else saving
+    if offer['flat'] is not None:
+        return min(offer['flat'], cart_total) if cart_total is not None else offer['flat']
+    return 0
+
+
+def rank_coupons(coupons, cart_total):
+    ranked = []
+    unpriced = []
+    for coupon in coupons:
+        if not is_app_coupon(coupon):
+            continue
+        saving = effective_discount(coupon, cart_total)
+        if saving > 0:
+            ranked.append(dict(coupon, saving=round(saving, 2)))
+        elif cart_total is None and parse_offer(coupon)['percent'] is not None:
+            # Without the cart total an uncapped percentage coupon cannot be priced.
+            # Try it after the priced ones, biggest percentage first, instead of dropping it.
+            unpriced.append((parse_offer(coupon)['percent'], dict(coupon, saving=0)))
+    ranked.sort(key=lambda coupon: coupon['saving'], reverse=True)
+    unpriced.sort(key=lambda entry: entry[0], reverse=True)
+    return ranked + [coupon for _, coupon in unpriced]
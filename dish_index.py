@@ -0,0 +1,94 @@
+import re
+import logging
+from collections import defaultdict
+
+from fuzzywuzzy import fuzz
+
+NGRAM_SIZE = 3
+MAX_CANDIDATES = 50
+MATCH_CUTOFF = 90
+SUGGESTION_CUTOFF = 60
+MAX_SUGGESTIONS = 3
+
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+logger = logging.getLogger(__name__)
+
+
+def normalise(name):
+    return ' '.join(_NON_WORD_RE.sub(' ', name.lower()).split())
+
+
+def ngrams(text):
+    grams = set()
+    for token in text.split():
+        padded = f' {token} '
+        for start in range(max(len(padded) - NGRAM_SIZE + 1, 1)):
+            grams.add(padded[start:start + NGRAM_SIZE])
+    return grams
+
+
+def build_dish_index(catalogue):
+    restaurants = defaultdict(list)
+    for restaurant, dishes in catalogue.items():
+        for dish in dishes:
+            if restaurant not in restaurants[dish]:
+                restaurants[dish].append(restaurant)
+    dishes = list(restaurants)
+    normalised = [normalise(dish) for dish in dishes]
+    exact = defaultdict(list)
+    grams = defaultdict(list)
+    gram_counts = []
+    for position, name in enumerate(normalised):
+        exact[' '.join(sorted(name.split()))].append(position)
+        dish_grams = ngrams(name)
+        gram_counts.append(len(dish_grams))
+        for gram in dish_grams:
+            grams[gram].append(position)
+    logger.info(f"Built dish index with {len(dishes)} dishes from {len(catalogue)} restaurants.")
+    return {
+        'dishes': dishes,
+        'normalised': normalised,
+        'restaurants': dict(restaurants),
+        'exact': dict(exact),
+        'grams': dict(grams),
+        'gram_counts': gram_counts,
+    }
+
+
+def _candidates(index, query_grams):
+    overlaps = defaultdict(int)
+    for gram in query_grams:
+        for position in index['grams'].get(gram, ()):
+            overlaps[position] += 1
+    ranked = sorted(
+        overlaps,
+        key=lambda position: 2 * overlaps[position] / (len(query_grams) + index['gram_counts'][position]),
+        reverse=True,
+    )
+    return ranked[:MAX_CANDIDATES]
+
+
+def find_dishes(index, query, limit=5, score_cutoff=MATCH_CUTOFF):
+    name = normalise(query)
+    if not name:
+        return []
+    positions = index['exact'].get(' '.join(sorted(name.split())))
+    if positions:
+        # Restaurants may spell the same dish differently ("Paneer Tikka", "paneer tikka"); return every spelling.
+        return [(index['dishes'][position], 100) for position in positions]
+    matches = []
+    for position in _candidates(index, ngrams(name)):
+        score = fuzz.token_sort_ratio(name, index['normalised'][position])
+        if score >= score_cutoff:
+            matches.append((index['dishes'][position], score))
+    matches.sort(key=lambda match: match[1], reverse=True)
+    return matches[:limit]
+
+
+def restaurants_for(index, dish):
+    return index['restaurants'].get(dish, [])
+
+
+def suggest_dishes(index, query, limit=MAX_SUGGESTIONS):
+    return [dish for dish, _ in find_dishes(index, query, limit=limit, score_cutoff=SUGGESTION_CUTOFF)]
@@ -0,0 +1,217 @@
+import os
+import shutil
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+POOL_SIZE = 2
+HOT_SPARES = 1
+RECYCLE_AFTER_ORDERS = 10
+LEASE_TIMEOUT = 120
+REPLACEMENT_BACKOFF = 5
+REPLACEMENT_MAX_BACKOFF = 300
+POOL_PROFILES_DIR = os.path.join(os.getcwd(), 'chrome_profiles')
+
+logger = logging.getLogger(__name__)
+
+_available = queue.Queue()
+_free_profiles = queue.Queue()
+_profiles = {}
+_orders = {}
+_replacement_started = set()
+_lock = threading.Lock()
+_factory = None
+_profiles_dir = POOL_PROFILES_DIR
+_closed = threading.Event()
+
+
+def worker_profiles_dir(pid):
+    return os.path.join(POOL_PROFILES_DIR, f'worker_{pid}')
+
+
+def prune_worker_profiles():
+    if not os.path.isdir(POOL_PROFILES_DIR):
+        return
+    for entry in os.listdir(POOL_PROFILES_DIR):
+        if not entry.startswith('worker_') or not entry[len('worker_'):].isdigit():
+            continue
+        pid = int(entry[len('worker_'):])
+        try:
+            os.kill(pid, 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            continue
+        logger.info(f"Removing the profiles of exited worker {pid}.")
+        shutil.rmtree(os.path.join(POOL_PROFILES_DIR, entry), ignore_errors=True)
+
+
+def prepare_profile(index):
+    profile_path = os.path.join(_profiles_dir, f'profile_{index}')
+    reset_profile(profile_path)
+    return profile_path
+
+
+def reset_profile(profile_path):
+    shutil.rmtree(profile_path, ignore_errors=True)
+    os.makedirs(profile_path, exist_ok=True)
+
+
+def _start_driver(profile_path):
+    if _closed.is_set():
+        return None
+    try:
+        driver = _factory(profile_path)
+    except Exception as e:
+        logger.error(f"Could not launch a driver on {profile_path}: {e}")
+        driver = None
+    if driver is None:
+        reset_profile(profile_path)
+        _free_profiles.put(profile_path)
+        return None
+    with _lock:
+        if _closed.is_set():
+            driver.quit()
+            return None
+        _profiles[id(driver)] = (driver, profile_path)
+        _orders[id(driver)] = 0
+    return driver
+
+
+def _build_replacement():
+    attempt = 0
+    while not _closed.is_set():
+        profile_path = _free_profiles.get()
+        logger.info(f"Building a replacement driver on {profile_path} in the background.")
+        driver = _start_driver(profile_path)
+        if driver is not None:
+            _available.put(driver)
+            logger.info(f"Replacement driver {id(driver)} added to the pool.")
+            return
+        # Keep trying, or the pool stays a driver short and every lease waits for the others.
+        delay = min(REPLACEMENT_BACKOFF * 2 ** attempt, REPLACEMENT_MAX_BACKOFF)
+        attempt += 1
+        logger.error(f"Failed to build a replacement driver. Retrying in {delay}s (attempt {attempt}).")
+        _closed.wait(delay)
+
+
+def _spawn_replacement():
+    threading.Thread(target=_build_replacement, daemon=True).start()
+
+
+def _retire(driver):
+    with _lock:
+        if id(driver) not in _profiles:
+            return
+        _, profile_path = _profiles.pop(id(driver))
+        _orders.pop(id(driver), None)
+    try:
+        driver.quit()
+        logger.info(f"Driver {id(driver)} closed.")
+    except Exception as e:
+        logger.warning(f"Error while closing the driver: {e}")
+    reset_profile(profile_path)
+    _free_profiles.put(profile_path)
+
+
+def is_healthy(driver):
+    try:
+        driver.current_url
+        return len(driver.window_handles) > 0
+    except Exception as e:
+        logger.warning(f"Driver {id(driver)} failed its health check: {e}")
+        return False
+
+
+def init_pool(factory, size=POOL_SIZE, profiles_dir=POOL_PROFILES_DIR):
+    global _factory, _profiles_dir
+    _factory = factory
+    _profiles_dir = profiles_dir
+    _closed.clear()
+    os.makedirs(profiles_dir, exist_ok=True)
+    for index in range(size + HOT_SPARES):
+        _free_profiles.put(prepare_profile(index))
+    profile_paths = [_free_profiles.get() for _ in range(size)]
+    started = []
+
+    def start(profile_path):
+        driver = _start_driver(profile_path)
+        if driver is not None:
+            started.append(driver)
+
+    threads = [threading.Thread(target=start, args=(path,)) for path in profile_paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for driver in started:
+        _available.put(driver)
+    logger.info(f"Driver pool ready with {len(started)}/{size} drivers.")
+    return len(started) > 0
+
+
+def lease_driver(timeout=LEASE_TIMEOUT):
+    driver = _available.get(timeout=timeout)
+    logger.info(f"Leased driver {id(driver)}. {_available.qsize()} driver(s) left in the pool.")
+    with _lock:
+        due_for_recycle = _orders[id(driver)] + 1 >= RECYCLE_AFTER_ORDERS
+        if due_for_recycle:
+            _replacement_started.add(id(driver))
+    if due_for_recycle:
+        _spawn_replacement()
+    return driver
+
+
+def release_driver(driver, healthy=True):
+    with _lock:
+        orders = _orders.get(id(driver), 0) + 1
+        _orders[id(driver)] = orders
+        replacement_started = id(driver) in _replacement_started
+        _replacement_started.discard(id(driver))
+    if _closed.is_set():
+        _retire(driver)
+        return
+    if healthy and orders < RECYCLE_AFTER_ORDERS and is_healthy(driver):
+        _available.put(driver)
+        logger.info(f"Driver {id(driver)} returned to the pool after {orders} order(s).")
+        return
+    logger.info(f"Retiring driver {id(driver)} after {orders} order(s).")
+    metrics.record_restart()
+    threading.Thread(target=_retire, args=(driver,), daemon=True).start()
+    if not replacement_started:
+        _spawn_replacement()
+
+
+@contextmanager
+def leased_driver(timeout=LEASE_TIMEOUT, is_clean=None):
+    driver = lease_driver(timeout)
+    healthy = True
+    try:
+        yield driver
+    except Exception as e:
+        # A failed order may leave the browser mid-checkout or behind a pop-up. Keep it only when the
+        # caller knows the failure left the page clean; release_driver still checks it is responsive.
+        healthy = is_clean is not None and is_clean(e)
+        raise
+    finally:
+        release_driver(driver, healthy)
+
+
+def shutdown_pool():
+    _closed.set()
+    with _lock:
+        drivers = [driver for driver, _ in _profiles.values()]
+        _profiles.clear()
+        _orders.clear()
+    while not _available.empty():
+        _available.get_nowait()
+    for driver in drivers:
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error while closing the driver: {e}")
+    logger.info("Driver pool shut down.")
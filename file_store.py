@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import tempfile
+from contextlib import contextmanager
+
+LOCK_POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def locked(path, timeout=None):
+    with open(f"{path}.lock", 'a+', encoding='utf-8') as lock_file:
+        if timeout is None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out after {timeout}s waiting for the lock on {path}.")
+                    time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield lock_file
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def modified_at(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_json(path):
+    try:
+        with open(path, encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Could not read {path}, treating it as empty: {e}")
+        return {}
+
+
+def write_json(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=f".{os.path.basename(path)}.",
+                                     suffix='.tmp', delete=False) as temp_file:
+        json.dump(data, temp_file, indent=2)
+    try:
+        os.replace(temp_file.name, path)
+    except OSError:
+        os.remove(temp_file.name)
+        raise
+
+
+def update_json(path, change):
+    with locked(path):
+        data = read_json(path)
+        change(data)
+        write_json(path, data)
+        return data, modified_at(path)
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+bind = os.environ.get('SWIGGY_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('SWIGGY_WORKERS', 2))
+worker_class = 'gthread'
+threads = 8
+preload_app = False
+# Workers drain running orders before exiting, so give them that long before the arbiter kills them.
+# Read the setting here instead of importing api, which would load Selenium and the caches into the arbiter.
+graceful_timeout = int(os.environ.get('SWIGGY_DRAIN_TIMEOUT', 300)) + 30
+timeout = 120
+
+# Each worker keeps its own metrics, so they write snapshots here and /metrics adds them up.
+os.environ.setdefault('SWIGGY_METRICS_DIR', os.path.join(os.getcwd(), 'metrics'))
+
+
+def on_starting(server):
+    metrics_dir = os.environ['SWIGGY_METRICS_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def worker_exit(server, worker):
+    # The worker's heartbeat file is already closed here, and the arbiter does not time out
+    # workers during a graceful stop, so drain without notifying it.
+    import api
+    api.shutdown_app()
@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+import urllib.request
+
+import file_store
+
+JOB_QUEUE_SIZE = 20
+JOB_RETENTION = 3600
+JOB_STALE_AFTER = 30 * 60
+CALLBACK_TIMEOUT = 10
+JOBS_DIR = os.path.join(os.getcwd(), 'order_jobs')
+
+STAGES = ('queued', 'searching', 'in_cart', 'coupon_applied', 'paying', 'placed', 'failed')
+
+logger = logging.getLogger(__name__)
+
+_jobs = {}
+_lock = threading.Lock()
+_queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+_current = threading.local()
+_stopping = threading.Event()
+_threads = []
+_JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f'{job_id}.json')
+
+
+def _write(job):
+    record = dict(job)
+    record.pop('callback_url', None)
+    try:
+        file_store.write_json(_job_path(job['id']), record)
+    except OSError as e:
+        logger.warning(f"Could not save job {job['id']} to {JOBS_DIR}: {e}")
+
+
+def _read(job_id):
+    if not _JOB_ID_RE.fullmatch(job_id):
+        return None
+    try:
+        with open(_job_path(job_id), encoding='utf-8') as job_file:
+            return json.load(job_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Could not read job {job_id} from {JOBS_DIR}: {e}")
+        return None
+
+
+def _set_status(job_id, status, error=None):
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        job['status'] = status
+        job['updated_at'] = now
+        job['history'].append({'status': status, 'at': now})
+        if error is not None:
+            job['error'] = error
+        _write(job)
+        return dict(job)
+
+
+def _prune():
+    cutoff = time.time() - JOB_RETENTION
+    with _lock:
+        expired = [job_id for job_id, job in _jobs.items()
+                   if job['status'] in ('placed', 'failed') and job['updated_at'] < cutoff]
+        for job_id in expired:
+            del _jobs[job_id]
+    if not os.path.isdir(JOBS_DIR):
+        return
+    for entry in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, entry)
+        try:
+            if os.path.getmtime(path) < cutoff - JOB_STALE_AFTER:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def submit_job(payload, callback_url=None):
+    if _stopping.is_set():
+        raise queue.Full
+    _prune()
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _lock:
+        _jobs[job_id] = {
+            'id': job_id,
+            'status': 'queued',
+            'payload': payload,
+            'callback_url': callback_url,
+            'created_at': now,
+            'updated_at': now,
+            'history': [{'status': 'queued', 'at': now}],
+            'error': None,
+        }
+    try:
+        _queue.put_nowait(job_id)
+    except queue.Full:
+        with _lock:
+            del _jobs[job_id]
+        raise
+    with _lock:
+        _write(_jobs[job_id])
+    logger.info(f"Queued job {job_id}. {_queue.qsize()} job(s) waiting.")
+    return job_id
+
+
+def _resumable(job):
+    if job['status'] == 'failed':
+        return True
+    # A job that another worker was running when it died never reaches 'failed'.
+    return job['status'] != 'placed' and time.time() - job['updated_at'] > JOB_STALE_AFTER
+
+
+def resume_job(job_id, payload):
+    if _stopping.is_set():
+        raise queue.Full
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        in_memory = job is not None
+        if job is None:
+            job = _read(job_id)
+            if job is not None:
+                job['callback_url'] = None
+        if job is not None and not _resumable(job):
+            return False
+        previous = dict(job, history=list(job['history'])) if in_memory else None
+        if job is None:
+            job = {
+                'id': job_id,
+                'callback_url': None,
+                'created_at': now,
+                'history': [],
+            }
+        _jobs[job_id] = job
+        job['payload'] = payload
+        job['status'] = 'queued'
+        job['updated_at'] = now
+        job['history'].append({'status': 'queued', 'at': now})
+        job['error'] = None
+    try:
+        _queue.put_nowait(job_id)
+    except queue.Full:
+        with _lock:
+            if previous is None:
+                del _jobs[job_id]
+            else:
+                _jobs[job_id] = previous
+        raise
+    with _lock:
+        _write(job)
+    logger.info(f"Queued job {job_id} again to resume it. {_queue.qsize()} job(s) waiting.")
+    return True
+
+
+def get_job(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return _read(job_id)
+        job = dict(job)
+        job['history'] = list(job['history'])
+    job.pop('callback_url', None)
+    return job
+
+
+def current_job_id():
+    return getattr(_current, 'job_id', None)
+
+
+def update_stage(status):
+    if status not in STAGES:
+        raise ValueError(f"Unknown job stage '{status}', expected one of {', '.join(STAGES)}.")
+    job_id = current_job_id()
+    if job_id is None:
+        return
+    _set_status(job_id, status)
+    logger.info(f"Job {job_id} is now '{status}'.")
+
+
+def _notify(job):
+    callback_url = job.get('callback_url')
+    if not callback_url:
+        return
+    job.pop('callback_url', None)
+    body = json.dumps(job).encode('utf-8')
+    callback_request = urllib.request.Request(
+        callback_url, data=body, headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    try:
+        with urllib.request.urlopen(callback_request, timeout=CALLBACK_TIMEOUT) as response:
+            logger.info(f"Callback for job {job['id']} returned {response.status}.")
+    except Exception as e:
+        logger.warning(f"Callback for job {job['id']} to {callback_url} failed: {e}")
+
+
+def is_stopping():
+    return _stopping.is_set()
+
+
+def _worker(handler):
+    while not _stopping.is_set():
+        try:
+            job_id = _queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        with _lock:
+            job = _jobs.get(job_id)
+            payload = job['payload'] if job else None
+        if payload is None:
+            continue
+        _current.job_id = job_id
+        try:
+            handler(payload)
+            job = _set_status(job_id, 'placed')
+            logger.info(f"Job {job_id} completed.")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            job = _set_status(job_id, 'failed', error=str(e))
+        finally:
+            _current.job_id = None
+        if job is not None:
+            _notify(job)
+
+
+def start_workers(handler, count):
+    _stopping.clear()
+    for index in range(count):
+        thread = threading.Thread(target=_worker, args=(handler,), name=f'order-worker-{index}', daemon=True)
+        thread.start()
+        _threads.append(thread)
+    logger.info(f"Started {count} order worker(s).")
+
+
+def stop_workers(timeout):
+    _stopping.set()
+    unstarted = []
+    while True:
+        try:
+            job_id = _queue.get_nowait()
+        except queue.Empty:
+            break
+        with _lock:
+            job = _jobs.get(job_id)
+            payload = job['payload'] if job else None
+        if payload is not None:
+            unstarted.append((job_id, payload))
+            _set_status(job_id, 'failed', error="The service restarted before this order started. "
+                                               f"Resume it with POST /order/{job_id}/resume.")
+    if unstarted:
+        logger.info(f"Stopped {len(unstarted)} queued job(s) that had not started.")
+    deadline = time.monotonic() + timeout
+    for thread in _threads:
+        thread.join(max(deadline - time.monotonic(), 0))
+    running = sum(thread.is_alive() for thread in _threads)
+    if running:
+        logger.warning(f"{running} order worker(s) were still busy after {timeout}s.")
+    else:
+        logger.info("All order workers finished their jobs.")
+    _threads.clear()
+    return unstarted
@@ -0,0 +1,64 @@
+import os
+import logging
+
+from selenium import webdriver
+
+LAUNCH_PROFILE = os.environ.get('SWIGGY_LAUNCH_PROFILE', 'desktop')
+WINDOW_SIZE = '1366,900'
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.mp3', '*.m3u8',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*connect.facebook.net*', '*clevertap*', '*hotjar*', '*branch.io*', '*sentry.io*',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def build_options(profile_path, profile=LAUNCH_PROFILE):
+    options = webdriver.ChromeOptions()
+    if profile_path:
+        options.add_argument(f"--user-data-dir={profile_path}")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    if profile == 'server':
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={WINDOW_SIZE}")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--disable-sync")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--mute-audio")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.page_load_strategy = 'eager'
+    else:
+        options.add_argument("--start-maximized")
+    return options
+
+
+def apply_request_blocking(driver, profile=LAUNCH_PROFILE):
+    if profile != 'server':
+        return
+    user_agent = driver.execute_cdp_cmd('Browser.getVersion', {})['userAgent']
+    if 'HeadlessChrome' in user_agent:
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+            'userAgent': user_agent.replace('HeadlessChrome', 'Chrome')
+        })
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    logger.info(f"Blocking {len(BLOCKED_URL_PATTERNS)} URL patterns for the server launch profile.")
+
+
+def launch_driver(profile_path, profile=LAUNCH_PROFILE):
+    driver = webdriver.Chrome(options=build_options(profile_path, profile))
+    try:
+        apply_request_blocking(driver, profile)
+    except Exception:
+        driver.quit()
+        raise
+    logger.info(f"Launched Chrome with the '{profile}' profile.")
+    return driver
@@ -4,7 +4,6 @@ import logging
 import traceback
 import re
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import (
     NoSuchElementException,
@@ -17,26 +16,25 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from bs4 import BeautifulSoup
 
+import waits
+import catalogue
+import launch_profile
+import selector_registry
+
 PHONE_NUMBER = '1234567890'
 SWIGGY_URL = 'https://www.swiggy.com'
 LOGIN_TIMEOUT = 300
 POLL_INTERVAL = 5
 ADDRESS_TO_SELECT = 'Home'
 
-restaurant_dict = {
-    "Beijing Bites": ["Chicken Schezwan Fried rice", "Honey Chilli Chicken"],
-    "Little Italy": ["Margherita Pizza", "Pasta Carbonara"],
-    "Quattro - The Leela Bhartiya City Bengaluru": ["Paneer Tikka", "Chicken Tikka Pizza"],
-    "Chung Wah": ["Spring Rolls", "Chicken Lung Fung Soup"],
-}
+restaurant_dict = catalogue.load_catalogue(catalogue.CATALOGUE_PATH)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def is_logged_in(driver):
     try:
-        sign_in_xpath = "//a[text()='Sign in']"
-        driver.find_element(By.XPATH, sign_in_xpath)
+        selector_registry.find(driver, 'sign_in')
         logger.info("'Sign in' button is present. User is not logged in.")
         return False
     except NoSuchElementException:
@@ -58,24 +56,15 @@ def manual_login(driver):
 
 def perform_login(driver):
     try:
-        sign_in_xpath = "//a[text()='Sign in']"
-        sign_in_button = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, sign_in_xpath))
-        )
+        sign_in_button = selector_registry.wait(driver, 'sign_in', EC.element_to_be_clickable, 20)
         sign_in_button.click()
         logger.info("'Sign in' button clicked.")
-        phone_input_xpath = "//input[@id='mobile']"
-        phone_input = WebDriverWait(driver, 20).until(
-            EC.visibility_of_element_located((By.XPATH, phone_input_xpath))
-        )
+        phone_input = selector_registry.wait(driver, 'phone_input', EC.visibility_of_element_located, 20)
         phone_input.clear()
         phone_input.send_keys(PHONE_NUMBER)
         logger.info(f"Entered phone number: {PHONE_NUMBER}")
-        submit_button_xpath = "//button[span/text()='CONTINUE']"
         try:
-            submit_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, submit_button_xpath))
-            )
+            submit_button = selector_registry.wait(driver, 'login_continue', EC.element_to_be_clickable, 10, required=False)
             submit_button.click()
             logger.info("'CONTINUE' button clicked.")
         except TimeoutException:
@@ -102,15 +91,9 @@ def select_address(driver):
         logger.info("Dropdown div found.")
         dropdown_div.click()
         logger.info("Dropdown arrow clicked.")
-        addresses_container_xpath = "//div[contains(text(), 'Saved addresses')]"
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.XPATH, addresses_container_xpath))
-        )
+        selector_registry.wait(driver, 'saved_addresses', EC.visibility_of_element_located, 10)
         logger.info("Address dropdown is visible.")
-        address_xpath = f"//span[contains(text(), '{ADDRESS_TO_SELECT}')]"
-        address_element = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, address_xpath))
-        )
+        address_element = selector_registry.wait(driver, 'saved_address', EC.element_to_be_clickable, 15, address=ADDRESS_TO_SELECT)
         address_element.click()
         logger.info(f"Address '{ADDRESS_TO_SELECT}' selected.")
     except Exception as e:
@@ -121,20 +104,14 @@ def select_address(driver):
 
 def search_restaurant(driver):
     try:
-        search_div_xpath = "//div[contains(text(), 'Search for restaurant, item or more')]"
-        search_div = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, search_div_xpath))
-        )
+        search_div = selector_registry.wait(driver, 'home_search_bar', EC.element_to_be_clickable, 10)
         search_div.click()
         logger.info("Search input div clicked.")
         WebDriverWait(driver, 10).until(
             EC.url_contains("/search")
         )
         logger.info("Navigated to search page.")
-        search_input_xpath = "//input[@placeholder='Search for restaurants and food']"
-        search_input = WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.XPATH, search_input_xpath))
-        )
+        search_input = selector_registry.wait(driver, 'restaurant_search_input', EC.visibility_of_element_located, 10)
         logger.info("Search input field found.")
         dish = input("Please enter the dish you want: ")
         logger.info(f"User entered dish: {dish}")
@@ -152,26 +129,14 @@ def search_restaurant(driver):
         search_input.clear()
         search_input.send_keys(restaurant_name)
         logger.info(f"Entered restaurant name '{restaurant_name}' into search input.")
-        autosuggest_xpath = "//div[contains(@class, '_29yzU')]"
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.XPATH, autosuggest_xpath))
-        )
+        selector_registry.wait(driver, 'autosuggest', EC.visibility_of_element_located, 10, required=False)
         logger.info("Autosuggest dropdown is visible.")
-        first_suggestion_xpath = "//div[contains(@class, '_29yzU')]//button[@data-testid='autosuggest-item'][1]"
-        first_suggestion = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, first_suggestion_xpath))
-        )
+        first_suggestion = selector_registry.wait(driver, 'first_suggestion', EC.element_to_be_clickable, 10)
         first_suggestion.click()
         logger.info("First suggestion clicked.")
-        results_container_xpath = "//div[contains(@class, 'Search_widgetsV2__27BBR')]"
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.XPATH, results_container_xpath))
-        )
+        selector_registry.wait(driver, 'search_results', EC.visibility_of_element_located, 10)
         logger.info("Search results are displayed.")
-        first_result_xpath = "//div[contains(@class, 'Search_widgetsV2__27BBR')]//a[@data-testid='resturant-card-anchor-container'][1]"
-        first_result = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, first_result_xpath))
-        )
+        first_result = selector_registry.wait(driver, 'first_restaurant_card', EC.element_to_be_clickable, 10)
         first_result.click()
         logger.info("First restaurant item clicked.")
         logger.info("Restaurant page loaded.")
@@ -184,13 +149,10 @@ def search_restaurant(driver):
 
 def add_dish_to_cart(driver, dish_name):
     try:
-        search_button_xpath = "//button[.//div[text()='Search for dishes']]"
-        search_button = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.XPATH, search_button_xpath))
-        )
+        search_button = selector_registry.wait(driver, 'menu_search_button', EC.presence_of_element_located, 15)
         logger.info("Search button found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", search_button)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, search_button, fallback=1)
         try:
             search_button.click()
             logger.info("Clicked the search button on the restaurant page.")
@@ -198,52 +160,40 @@ def add_dish_to_cart(driver, dish_name):
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
             driver.execute_script("arguments[0].click();", search_button)
             logger.info("Clicked the search button using JavaScript.")
-        search_input_xpath = "//input[@data-cy='menu-search-header']"
-        search_input = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, search_input_xpath))
-        )
+        search_input = selector_registry.wait(driver, 'menu_search_input', EC.visibility_of_element_located, 15)
         logger.info("Dish search input field found.")
         search_input.clear()
         search_input.send_keys(dish_name)
         logger.info(f"Entered dish name '{dish_name}' into search input.")
-        dish_list_xpath = "//div[@data-testid='normal-dish-item']"
-        WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, dish_list_xpath))
-        )
+        first_dish = selector_registry.wait(driver, 'dish_item', EC.visibility_of_element_located, 15)
         logger.info("Dish list is displayed.")
-        first_dish_xpath = f"({dish_list_xpath})[1]"
-        first_dish = driver.find_element(By.XPATH, first_dish_xpath)
         logger.info("First dish item found.")
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", first_dish)
-        time.sleep(1)
-        minus_button_xpath = ".//button[contains(@class, 'add-button-left-container')]//div[text()='−']"
-        add_button_xpath = ".//button[contains(@class, 'add-button-center-container')]"
+        waits.settle_after_scroll(driver, first_dish, fallback=1)
         def remove_existing_quantities():
             try:
-                minus_button = first_dish.find_element(By.XPATH, minus_button_xpath)
+                minus_button = selector_registry.find(first_dish, 'dish_minus_button')
                 logger.info("Minus button found. Removing existing quantities.")
                 max_attempts = 10
                 attempts = 0
                 while attempts < max_attempts:
                     minus_button.click()
                     logger.info("Clicked the minus button to remove one item.")
-                    time.sleep(1)
+                    waits.settle_dom(driver, fallback=1)
                     try:
-                        first_dish.find_element(By.XPATH, add_button_xpath)
+                        selector_registry.find(first_dish, 'dish_add_button')
                         logger.info("'Add' button is now present.")
                         break
                     except:
-                        minus_button = first_dish.find_element(By.XPATH, minus_button_xpath)
+                        minus_button = selector_registry.find(first_dish, 'dish_minus_button')
                     attempts += 1
                 else:
                     logger.warning("Minus button still present after maximum attempts.")
             except:
                 logger.info("Minus button not present. No existing quantities to remove.")
         remove_existing_quantities()
-        add_button = first_dish.find_element(By.XPATH, add_button_xpath)
-        WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, add_button_xpath))
-        )
+        add_button = selector_registry.find(first_dish, 'dish_add_button')
+        WebDriverWait(driver, 10).until(EC.element_to_be_clickable(add_button))
         def click_add_button():
             try:
                 add_button.click()
@@ -267,13 +217,10 @@ def add_dish_to_cart(driver, dish_name):
                         return False
         clicked = click_add_button()
         try:
-            popup_button_xpath = "//button[contains(@class, 'hoJL8') and text()='Yes, start afresh']"
-            popup_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, popup_button_xpath))
-            )
+            popup_button = selector_registry.wait(driver, 'start_afresh', EC.element_to_be_clickable, 10, required=False)
             logger.info("'Yes, start afresh' pop-up appeared.")
             driver.execute_script("arguments[0].scrollIntoView(true);", popup_button)
-            time.sleep(1)
+            waits.settle_after_scroll(driver, popup_button, fallback=1)
             try:
                 popup_button.click()
                 logger.info("Clicked 'Yes, start afresh' button on the pop-up.")
@@ -285,14 +232,11 @@ def add_dish_to_cart(driver, dish_name):
                 logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
                 driver.execute_script("arguments[0].click();", popup_button)
                 logger.info("Clicked 'Yes, start afresh' button using JavaScript.")
-            time.sleep(1)
+            waits.settle_dom(driver, fallback=1)
         except TimeoutException:
             logger.info("No 'Yes, start afresh' pop-up appeared.")
         try:
-            add_item_to_cart_button_xpath = "//button[@data-cy='customize-footer-add-button']"
-            add_item_to_cart_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, add_item_to_cart_button_xpath))
-            )
+            add_item_to_cart_button = selector_registry.wait(driver, 'customize_add_to_cart', EC.element_to_be_clickable, 5, required=False)
             add_item_to_cart_button.click()
             logger.info("Clicked 'Add Item to cart' button in the pop-up.")
         except TimeoutException:
@@ -305,20 +249,16 @@ def add_dish_to_cart(driver, dish_name):
             except Exception as e:
                 logger.error(f"All methods failed to click 'Add Item to cart' button: {e}.")
         try:
-            modal_xpath = "//div[contains(@class, 'styles_container__')]"
-            WebDriverWait(driver, 5).until(
-                EC.visibility_of_element_located((By.XPATH, modal_xpath))
-            )
+            selector_registry.wait(driver, 'customization_modal', EC.visibility_of_element_located, 5, required=False)
             logger.info("Customization modal is displayed.")
-            add_item_button_xpath = "//button[normalize-space()='Add Item']"
-            add_item_button = driver.find_element(By.XPATH, add_item_button_xpath)
+            add_item_button = selector_registry.find(driver, 'modal_add_item')
             add_item_button.click()
             logger.info("Add Item button in the modal clicked.")
         except TimeoutException:
             logger.info("No customization modal appeared.")
         except Exception as e:
             logger.warning(f"Failed to handle customization modal: {e}.")
-        time.sleep(2)
+        waits.settle_page(driver, fallback=2)
         logger.info(f"Dish '{dish_name}' added to the cart.")
         checkout(driver)
     except Exception as e:
@@ -329,13 +269,10 @@ def add_dish_to_cart(driver, dish_name):
 
 def checkout(driver):
     try:
-        view_cart_button_xpath = "//button[@id='view-cart-btn']"
-        view_cart_button = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, view_cart_button_xpath))
-        )
+        view_cart_button = selector_registry.wait(driver, 'view_cart', EC.element_to_be_clickable, 15)
         logger.info("View Cart button found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", view_cart_button)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, view_cart_button, fallback=1)
         try:
             view_cart_button.click()
             logger.info("Clicked the View Cart button.")
@@ -343,13 +280,10 @@ def checkout(driver):
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
             driver.execute_script("arguments[0].click();", view_cart_button)
             logger.info("Clicked the View Cart button using JavaScript.")
-        address_div_xpath = "//div[@class='PPJbN' and text()='Home']/ancestor::div[@class='_3FahR']"
-        address_div = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, address_div_xpath))
-        )
+        address_div = selector_registry.wait(driver, 'checkout_address', EC.element_to_be_clickable, 15, address=ADDRESS_TO_SELECT)
         logger.info("Address div found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", address_div)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, address_div, fallback=1)
         try:
             address_div.click()
             logger.info("Clicked the address div to select delivery address.")
@@ -357,13 +291,10 @@ def checkout(driver):
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
             driver.execute_script("arguments[0].click();", address_div)
             logger.info("Clicked the address div using JavaScript.")
-        apply_coupon_button_xpath = "//div[@role='button' and @aria-label='Apply Coupon']"
-        apply_coupon_button = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, apply_coupon_button_xpath))
-        )
+        apply_coupon_button = selector_registry.wait(driver, 'apply_coupon', EC.element_to_be_clickable, 15)
         logger.info("Apply Coupon button found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", apply_coupon_button)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, apply_coupon_button, fallback=1)
         try:
             apply_coupon_button.click()
             logger.info("Clicked the Apply Coupon button.")
@@ -371,18 +302,15 @@ def checkout(driver):
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
             driver.execute_script("arguments[0].click();", apply_coupon_button)
             logger.info("Clicked the Apply Coupon button using JavaScript.")
-        coupon_popup_xpath = "//div[contains(@class, '_2qrkp')]"
-        coupon_popup = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, coupon_popup_xpath))
-        )
+        coupon_popup = selector_registry.wait(driver, 'coupon_popup', EC.visibility_of_element_located, 15)
         logger.info("Coupon popup appeared.")
-        coupon_popup_element = driver.find_element(By.XPATH, coupon_popup_xpath)
+        coupon_popup_element = selector_registry.find(driver, 'coupon_popup')
         try:
             last_height = driver.execute_script("return arguments[0].scrollHeight", coupon_popup_element)
             logger.info(f"Initial scroll height: {last_height}")
             while True:
                 driver.execute_script("arguments[0].scrollTo(0, arguments[0].scrollHeight);", coupon_popup_element)
-                time.sleep(1)
+                waits.settle_page(driver)
                 new_height = driver.execute_script("return arguments[0].scrollHeight", coupon_popup_element)
                 logger.info(f"New scroll height: {new_height}")
                 if new_height == last_height:
@@ -441,18 +369,12 @@ def checkout(driver):
             logger.info("Available Coupons section not found.")
             coupon_to_apply = None
         if coupon_to_apply:
-            coupon_input_xpath = "//input[@placeholder='Enter coupon code']"
-            coupon_input = WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, coupon_input_xpath))
-            )
+            coupon_input = selector_registry.wait(driver, 'coupon_input', EC.presence_of_element_located, 15)
             logger.info("Coupon input field found.")
             coupon_input.clear()
             coupon_input.send_keys(coupon_to_apply)
             logger.info(f"Entered coupon code: {coupon_to_apply}")
-            apply_button_xpath = "//a[text()='APPLY']"
-            apply_button = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.XPATH, apply_button_xpath))
-            )
+            apply_button = selector_registry.wait(driver, 'coupon_apply', EC.element_to_be_clickable, 15)
             logger.info("Apply button found.")
             try:
                 apply_button.click()
@@ -463,23 +385,17 @@ def checkout(driver):
                 logger.info("Clicked the Apply button using JavaScript.")
         else:
             logger.info("No valid coupon to apply.")
-        close_button_xpath = "//span[contains(@class, '_1X6No')]"
         try:
-            close_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, close_button_xpath))
-            )
+            close_button = selector_registry.wait(driver, 'coupon_popup_close', EC.element_to_be_clickable, 10, required=False)
             close_button.click()
             logger.info("Closed the coupon popup.")
         except Exception as e:
             logger.warning(f"Could not close the coupon popup: {e}")
         try:
-            yay_button_xpath = "//button[contains(@class, '_1vTiX') and text()='YAY!']"
-            yay_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, yay_button_xpath))
-            )
+            yay_button = selector_registry.wait(driver, 'coupon_yay', EC.element_to_be_clickable, 5, required=False)
             logger.info("YAY! button found.")
             driver.execute_script("arguments[0].scrollIntoView(true);", yay_button)
-            time.sleep(1)
+            waits.settle_after_scroll(driver, yay_button, fallback=1)
             try:
                 yay_button.click()
                 logger.info("Clicked the YAY! button.")
@@ -489,13 +405,10 @@ def checkout(driver):
                 logger.info("Clicked the YAY! button using JavaScript.")
         except TimeoutException:
             logger.info("YAY! button did not appear. Proceeding to 'Proceed to Pay'.")
-        proceed_to_pay_button_xpath = "//button[contains(@class, '_4dnMB') and text()='Proceed to Pay']"
-        proceed_to_pay_button = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, proceed_to_pay_button_xpath))
-        )
+        proceed_to_pay_button = selector_registry.wait(driver, 'proceed_to_pay', EC.element_to_be_clickable, 15)
         logger.info("Proceed to Pay button found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", proceed_to_pay_button)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, proceed_to_pay_button, fallback=1)
         try:
             proceed_to_pay_button.click()
             logger.info("Clicked the Proceed to Pay button.")
@@ -503,13 +416,10 @@ def checkout(driver):
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
             driver.execute_script("arguments[0].click();", proceed_to_pay_button)
             logger.info("Clicked the Proceed to Pay button using JavaScript.")
-        payment_method_div_xpath = "//div[@data-testid='pm_si_container' and .//div[contains(text(), 'Swiggy Money')]]"
-        payment_method_div = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, payment_method_div_xpath))
-        )
+        payment_method_div = selector_registry.wait(driver, 'swiggy_money', EC.element_to_be_clickable, 15)
         logger.info("Swiggy Money payment method div found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", payment_method_div)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, payment_method_div, fallback=1)
         try:
             payment_method_div.click()
             logger.info("Clicked the Swiggy Money payment method div.")
@@ -517,13 +427,10 @@ def checkout(driver):
             logger.warning(f"Normal click failed: {e}. Trying JavaScript click.")
             driver.execute_script("arguments[0].click();", payment_method_div)
             logger.info("Clicked the Swiggy Money payment method div using JavaScript.")
-        pay_button_xpath = "//button[@data-testid='pm_si_pay_btn' and contains(text(), 'Pay')]"
-        pay_button = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, pay_button_xpath))
-        )
+        pay_button = selector_registry.wait(driver, 'pay_button', EC.element_to_be_clickable, 15)
         logger.info("'Pay' button found.")
         driver.execute_script("arguments[0].scrollIntoView(true);", pay_button)
-        time.sleep(1)
+        waits.settle_after_scroll(driver, pay_button, fallback=1)
         try:
             pay_button.click()
             logger.info("Clicked the 'Pay' button.")
@@ -538,17 +445,12 @@ def checkout(driver):
         logger.info("Screenshot saved as checkout_error.png.")
 
 def main():
-    options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
     profile_path = os.path.join(os.getcwd(), 'chrome_profile')
-    options.add_argument(f"--user-data-dir={profile_path}")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    driver = webdriver.Chrome(options=options)
+    driver = launch_profile.launch_driver(profile_path)
     try:
         driver.get(SWIGGY_URL)
         logger.info(f"Navigated to {SWIGGY_URL}.")
-        time.sleep(5)
+        waits.settle_page(driver, fallback=5)
         if is_logged_in(driver):
             logger.info("User is already logged in.")
         else:
@@ -563,8 +465,9 @@ def main():
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
     finally:
-        time.sleep(5)
+        waits.settle_page(driver, fallback=5)
         driver.quit()
+        selector_registry.flush()
         logger.info("Browser closed.")
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+import threading
+
+import dish_index
+import file_store
+
+MENU_INDEX_PATH = os.path.join(os.getcwd(), 'menu_index.json')
+MENU_INDEX_TTL = 24 * 3600
+REFRESH_INTERVAL = 60
+SCROLL_SETTLE_MS = 500
+SCROLL_TIMEOUT_MS = 15000
+
+ITEM_NAME_JS = """
+function itemName(item) {
+    var heading = item.querySelector('h3, [class*="itemNameText"], [class*="ItemName"]');
+    var text = heading ? heading.textContent : item.innerText.split('\\n')[0];
+    return text.trim();
+}
+"""
+
+LOCATE_DISH_SCRIPT = ITEM_NAME_JS + """
+var wanted = arguments[0];
+var items = document.querySelectorAll("[data-testid='normal-dish-item']");
+for (var position = 0; position < items.length; position++) {
+    var name = itemName(items[position]).toLowerCase().replace(/[^a-z0-9]+/g, ' ').trim();
+    if (name === wanted) {
+        return position + 1;
+    }
+}
+return null;
+"""
+
+CAPTURE_MENU_SCRIPT = ITEM_NAME_JS + """
+var settleMs = arguments[0];
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+var lastHeight = -1;
+var lastChange = Date.now();
+var startY = window.scrollY;
+
+function itemId(item) {
+    if (item.id) {
+        return item.id;
+    }
+    var withId = item.querySelector('[id]');
+    return withId ? withId.id : null;
+}
+
+function capture() {
+    var items = [];
+    document.querySelectorAll("[data-testid='normal-dish-item']").forEach(function(item) {
+        var text = item.innerText;
+        var price = text.match(/₹\\s*([\\d,]+(?:\\.\\d+)?)/);
+        items.push({
+            id: itemId(item),
+            name: itemName(item),
+            price: price ? parseFloat(price[1].replace(/,/g, '')) : null,
+            customisable: /customi[sz]able/i.test(text),
+            available: !!item.querySelector("button[class*='add-button']") && !/sold out|unavailable|next available/i.test(text)
+        });
+    });
+    window.scrollTo(0, startY);
+    return items;
+}
+
+(function poll() {
+    window.scrollTo(0, document.body.scrollHeight);
+    if (document.body.scrollHeight !== lastHeight) {
+        lastHeight = document.body.scrollHeight;
+        lastChange = Date.now();
+    }
+    if (Date.now() - lastChange >= settleMs || Date.now() - started >= timeoutMs) {
+        done(capture());
+    } else {
+        setTimeout(poll, 100);
+    }
+})();
+"""
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries = None
+_modified_at = None
+_pending = set()
+_wake = threading.Event()
+
+
+def _load():
+    global _entries, _modified_at
+    modified_at = file_store.modified_at(MENU_INDEX_PATH)
+    if _entries is not None and modified_at == _modified_at:
+        return _entries
+    _entries = file_store.read_json(MENU_INDEX_PATH)
+    _modified_at = modified_at
+    logger.info(f"Loaded menu snapshots for {len(_entries)} restaurant(s).")
+    return _entries
+
+
+def capture_menu(driver):
+    return driver.execute_async_script(CAPTURE_MENU_SCRIPT, SCROLL_SETTLE_MS, SCROLL_TIMEOUT_MS)
+
+
+def locate_dish(driver, dish_name):
+    return driver.execute_script(LOCATE_DISH_SCRIPT, dish_index.normalise(dish_name))
+
+
+def save_menu(restaurant_name, items):
+    global _entries, _modified_at
+
+    def save(entries):
+        entries[restaurant_name] = {'items': items, 'saved_at': time.time()}
+
+    with _lock:
+        # Other workers snapshot menus into the same file, so merge into what is on disk.
+        _entries, _modified_at = file_store.update_json(MENU_INDEX_PATH, save)
+        _pending.discard(restaurant_name)
+    logger.info(f"Saved a menu snapshot of {len(items)} item(s) for '{restaurant_name}'.")
+
+
+def get_menu(restaurant_name, max_age=MENU_INDEX_TTL):
+    with _lock:
+        entry = _load().get(restaurant_name)
+    if entry is None or time.time() - entry['saved_at'] > max_age:
+        return None
+    return entry
+
+
+def match_dish(items, dish_name):
+    wanted = dish_index.normalise(dish_name)
+    for item in items:
+        if dish_index.normalise(item['name']) == wanted:
+            return item
+    return None
+
+
+def find_dish(restaurant_name, dish_name):
+    with _lock:
+        entry = _load().get(restaurant_name)
+        stale = entry is None or time.time() - entry['saved_at'] > MENU_INDEX_TTL
+    if stale:
+        request_refresh(restaurant_name)
+    if entry is None:
+        return None
+    item = match_dish(entry['items'], dish_name)
+    if item is not None:
+        return item
+    logger.info(f"'{dish_name}' is not in the menu snapshot of '{restaurant_name}'.")
+    request_refresh(restaurant_name)
+    return None
+
+
+def request_refresh(restaurant_name):
+    with _lock:
+        if restaurant_name in _pending:
+            return
+        _pending.add(restaurant_name)
+    _wake.set()
+
+
+def start_refresher(refresh, interval=REFRESH_INTERVAL):
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            _wake.wait(interval)
+            _wake.clear()
+            with _lock:
+                pending = list(_pending)
+            for restaurant_name in pending:
+                try:
+                    items = refresh(restaurant_name)
+                except Exception as e:
+                    logger.warning(f"Refreshing the menu snapshot of '{restaurant_name}' failed: {e}")
+                    continue
+                if items:
+                    save_menu(restaurant_name, items)
+
+    threading.Thread(target=run, name='menu-index-refresher', daemon=True).start()
+    logger.info(f"Refreshing menu snapshots in the background every {interval}s.")
+    return stop_event
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+
+import file_store
+
+STAGE_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+TRACE_DIR = os.environ.get('SWIGGY_TRACE_DIR')
+METRICS_DIR = os.environ.get('SWIGGY_METRICS_DIR')
+SNAPSHOT_INTERVAL = 5
+
+COUNTER_HELP = {
+    'swiggy_fallback_clicks_total': 'Clicks that needed the ActionChains or JavaScript fallback.',
+    'swiggy_popups_handled_total': 'Pop-ups detected and dismissed while ordering.',
+    'swiggy_driver_restarts_total': 'Drivers retired and replaced by the pool.',
+    'swiggy_selector_failures_total': 'Waits that timed out, by selector.',
+    'swiggy_selector_lookups_total': 'Selector lookups by candidate locator and result.',
+    'swiggy_stage_failures_total': 'Stages that raised an exception.',
+    'swiggy_menu_prefetches_total': 'Menu pages opened ahead of time in a second tab, by result.',
+    'swiggy_stage_retries_total': 'Order stages retried after a stale element or an intercepted click.',
+    'swiggy_restaurant_fallbacks_total': 'Dishes moved to another restaurant because theirs was unavailable.',
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_trace = threading.local()
+
+
+def observe_stage(stage, seconds):
+    with _lock:
+        histogram = _histograms.setdefault(stage, {'buckets': [0] * len(STAGE_BUCKETS), 'sum': 0.0, 'count': 0})
+        for position, bound in enumerate(STAGE_BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][position] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+
+def increment(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def record_fallback(target):
+    increment('swiggy_fallback_clicks_total', target=target)
+
+
+def record_popup(popup):
+    increment('swiggy_popups_handled_total', popup=popup)
+
+
+def record_restart():
+    increment('swiggy_driver_restarts_total')
+
+
+def record_failure(selector):
+    increment('swiggy_selector_failures_total', selector=selector)
+
+
+def record_prefetch(result):
+    increment('swiggy_menu_prefetches_total', result=result)
+
+
+def record_stage_retry(stage):
+    increment('swiggy_stage_retries_total', stage=stage)
+
+
+def record_restaurant_fallback(restaurant):
+    increment('swiggy_restaurant_fallbacks_total', restaurant=restaurant)
+
+
+@contextmanager
+def stage(name):
+    started = time.monotonic()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        increment('swiggy_stage_failures_total', stage=name)
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        observe_stage(name, seconds)
+        events = getattr(_trace, 'events', None)
+        if events is not None:
+            events.append({
+                'stage': name,
+                'offset': round(started - _trace.started, 3),
+                'seconds': round(seconds, 3),
+                'ok': ok,
+            })
+
+
+def timed_stage(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace(order_id):
+    _trace.order_id = order_id
+    _trace.started = time.monotonic()
+    _trace.events = []
+
+
+def finish_trace(status):
+    events = getattr(_trace, 'events', None)
+    if events is None:
+        return None
+    trace = {
+        'order_id': _trace.order_id,
+        'status': status,
+        'seconds': round(time.monotonic() - _trace.started, 3),
+        'stages': events,
+    }
+    _trace.events = None
+    if TRACE_DIR:
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            with open(os.path.join(TRACE_DIR, f"order_{trace['order_id']}.json"), 'w', encoding='utf-8') as trace_file:
+                json.dump(trace, trace_file, indent=2)
+        except OSError as e:
+            logger.warning(f"Could not write trace for order {trace['order_id']}: {e}")
+    return trace
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _snapshot():
+    with _lock:
+        histograms = {name: dict(data, buckets=list(data['buckets'])) for name, data in _histograms.items()}
+        counters = dict(_counters)
+    return histograms, counters
+
+
+def write_snapshot():
+    if not METRICS_DIR:
+        return
+    histograms, counters = _snapshot()
+    snapshot = {
+        'histograms': histograms,
+        'counters': [[name, [list(label) for label in labels], value] for (name, labels), value in counters.items()],
+    }
+    try:
+        file_store.write_json(os.path.join(METRICS_DIR, f'worker_{os.getpid()}.json'), snapshot)
+    except OSError as e:
+        logger.warning(f"Could not write metrics to {METRICS_DIR}: {e}")
+
+
+def start_snapshots(interval=SNAPSHOT_INTERVAL):
+    stop_event = threading.Event()
+    if not METRICS_DIR:
+        return stop_event
+
+    def run():
+        while not stop_event.wait(interval):
+            write_snapshot()
+
+    threading.Thread(target=run, name='metrics-snapshots', daemon=True).start()
+    logger.info(f"Writing metrics to {METRICS_DIR} every {interval}s.")
+    return stop_event
+
+
+def _collect():
+    # Under gunicorn every worker counts on its own, so a scrape adds up the snapshots of all of them,
+    # including workers that have exited since, the way prometheus_client's multiprocess mode does.
+    if not METRICS_DIR:
+        return _snapshot()
+    write_snapshot()
+    histograms = {}
+    counters = {}
+    for entry in sorted(os.listdir(METRICS_DIR)):
+        if not entry.startswith('worker_') or not entry.endswith('.json'):
+            continue
+        snapshot = file_store.read_json(os.path.join(METRICS_DIR, entry))
+        for name, data in snapshot.get('histograms', {}).items():
+            histogram = histograms.setdefault(name, {'buckets': [0] * len(STAGE_BUCKETS), 'sum': 0.0, 'count': 0})
+            histogram['buckets'] = [total + count for total, count in zip(histogram['buckets'], data['buckets'])]
+            histogram['sum'] += data['sum']
+            histogram['count'] += data['count']
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def render():
+    histograms, counters = _collect()
+    lines = [
+        '# HELP swiggy_stage_seconds Time spent in each order stage.',
+        '# TYPE swiggy_stage_seconds histogram',
+    ]
+    for name in sorted(histograms):
+        histogram = histograms[name]
+        for bound, count in zip(STAGE_BUCKETS, histogram['buckets']):
+            lines.append(f'swiggy_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'swiggy_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'swiggy_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+        lines.append(f'swiggy_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+    for counter, help_text in COUNTER_HELP.items():
+        lines.append(f'# HELP {counter} {help_text}')
+        lines.append(f'# TYPE {counter} counter')
+        for (name, labels), value in sorted(counters.items()):
+            if name == counter:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
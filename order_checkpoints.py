@@ -0,0 +1,65 @@
+import os
+import re
+import json
+import time
+import logging
+
+import file_store
+
+ORDER_CHECKPOINTS_DIR = os.path.join(os.getcwd(), 'order_checkpoints')
+CHECKPOINT_TTL = 6 * 3600
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def _path(job_id):
+    if not _JOB_ID_RE.fullmatch(job_id):
+        return None
+    return os.path.join(ORDER_CHECKPOINTS_DIR, f'{job_id}.json')
+
+
+def _prune():
+    cutoff = time.time() - CHECKPOINT_TTL
+    for entry in os.listdir(ORDER_CHECKPOINTS_DIR):
+        path = os.path.join(ORDER_CHECKPOINTS_DIR, entry)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def get_checkpoint(job_id):
+    path = _path(job_id)
+    if path is None:
+        return None
+    try:
+        if time.time() - os.path.getmtime(path) > CHECKPOINT_TTL:
+            return None
+        with open(path, encoding='utf-8') as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Could not read the checkpoint of order {job_id}: {e}")
+        return None
+
+
+def save_checkpoint(job_id, checkpoint):
+    path = _path(job_id)
+    if path is None:
+        return
+    file_store.write_json(path, checkpoint)
+    _prune()
+
+
+def discard(job_id):
+    path = _path(job_id)
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,27 @@
+import time
+import logging
+import threading
+
+QUOTE_TTL = 60
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_quotes = {}
+
+
+def get_quote(dish_name, quantity):
+    key = (dish_name, quantity)
+    with _lock:
+        entry = _quotes.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['saved_at'] > QUOTE_TTL:
+            del _quotes[key]
+            return None
+        return dict(entry['quote'])
+
+
+def save_quote(dish_name, quantity, quote):
+    with _lock:
+        _quotes[(dish_name, quantity)] = {'quote': dict(quote), 'saved_at': time.time()}
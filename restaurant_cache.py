@@ -0,0 +1,71 @@
+import os
+import time
+import logging
+import threading
+
+import file_store
+
+RESTAURANT_URLS_PATH = os.path.join(os.getcwd(), 'restaurant_urls.json')
+RESTAURANT_URL_TTL = 7 * 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries = None
+_modified_at = None
+
+
+def _load():
+    global _entries, _modified_at
+    modified_at = file_store.modified_at(RESTAURANT_URLS_PATH)
+    if _entries is not None and modified_at == _modified_at:
+        return _entries
+    _entries = file_store.read_json(RESTAURANT_URLS_PATH)
+    _modified_at = modified_at
+    logger.info(f"Loaded {len(_entries)} cached restaurant URLs.")
+    return _entries
+
+
+def _update(change):
+    # Other workers write the same file, so apply the change to what is on disk, not to our copy.
+    global _entries, _modified_at
+    _entries, _modified_at = file_store.update_json(RESTAURANT_URLS_PATH, change)
+
+
+def get_url(restaurant_name):
+    with _lock:
+        entry = _load().get(restaurant_name)
+        if entry is None:
+            return None
+        if time.time() - entry['saved_at'] > RESTAURANT_URL_TTL:
+            logger.info(f"Cached menu URL for '{restaurant_name}' expired.")
+
+            def expire(entries):
+                if entries.get(restaurant_name, {}).get('saved_at') == entry['saved_at']:
+                    del entries[restaurant_name]
+
+            _update(expire)
+            return None
+        return entry['url']
+
+
+def save_url(restaurant_name, url):
+    def save(entries):
+        entries[restaurant_name] = {'url': url, 'saved_at': time.time()}
+
+    with _lock:
+        _update(save)
+    logger.info(f"Cached menu URL for '{restaurant_name}': {url}")
+
+
+def invalidate(restaurant_name):
+    with _lock:
+        if restaurant_name in _load():
+            _update(lambda entries: entries.pop(restaurant_name, None))
+            logger.info(f"Invalidated cached menu URL for '{restaurant_name}'.")
+
+
+def clear():
+    with _lock:
+        _update(lambda entries: entries.clear())
+    logger.info("Cleared all cached menu URLs.")
@@ -0,0 +1,388 @@
+import os
+import math
+import time
+import logging
+import threading
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+import metrics
+import file_store
+
+STATS_PATH = os.path.join(os.getcwd(), 'selector_stats.json')
+STATS_PERSIST_INTERVAL = 30
+BROKEN_AFTER = 3
+BROKEN_TIMEOUT = 1.5
+POLL_FREQUENCY = 0.2
+
+LOCATE_JS = """
+function locate(by, value) {
+    if (by === 'xpath') {
+        return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    if (by === 'css selector') {
+        return document.querySelector(value);
+    }
+    if (by === 'id') {
+        return document.getElementById(value);
+    }
+    return null;
+}
+
+function shown(element) {
+    if (!element.getClientRects().length || element.disabled) {
+        return false;
+    }
+    var style = window.getComputedStyle(element);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+function firstShown(candidates) {
+    for (var index = 0; index < candidates.length; index++) {
+        var element = locate(candidates[index][0], candidates[index][1]);
+        if (element && shown(element)) {
+            return [index, element];
+        }
+    }
+    return null;
+}
+"""
+
+DETECT_SCRIPT = LOCATE_JS + """
+var selectors = arguments[0];
+for (var i = 0; i < selectors.length; i++) {
+    var found = firstShown(selectors[i][1]);
+    if (found) {
+        return [selectors[i][0], found[0], found[1]];
+    }
+}
+return null;
+"""
+
+SELECTORS = {
+    'sign_in': [
+        (By.XPATH, "//a[text()='Sign in']"),
+        (By.XPATH, "//a[normalize-space()='Sign in']"),
+    ],
+    'phone_input': [
+        (By.XPATH, "//input[@id='mobile']"),
+        (By.XPATH, "//input[@type='tel']"),
+    ],
+    'login_continue': [
+        (By.XPATH, "//button[span/text()='CONTINUE']"),
+        (By.XPATH, "//button[normalize-space()='CONTINUE']"),
+    ],
+    'location_input': [
+        (By.ID, 'location'),
+    ],
+    'location_dropdown': [
+        (By.XPATH, "following::div[@style='line-height:0'][1]"),
+    ],
+    'saved_addresses': [
+        (By.XPATH, "//div[contains(text(), 'Saved addresses')]"),
+    ],
+    'saved_address': [
+        (By.XPATH, "//span[contains(text(), '{address}')]"),
+    ],
+    'home_search_bar': [
+        (By.XPATH, "//div[contains(text(), 'Search for restaurant, item or more')]"),
+    ],
+    'restaurant_search_input': [
+        (By.XPATH, "//input[@placeholder='Search for restaurants and food']"),
+        (By.XPATH, "//input[contains(@placeholder, 'Search for restaurants')]"),
+    ],
+    'autosuggest': [
+        (By.XPATH, "//div[contains(@class, '_29yzU')]"),
+        (By.XPATH, "//button[@data-testid='autosuggest-item']/parent::div"),
+    ],
+    'first_suggestion': [
+        (By.XPATH, "//div[contains(@class, '_29yzU')]//button[@data-testid='autosuggest-item'][1]"),
+        (By.XPATH, "(//button[@data-testid='autosuggest-item'])[1]"),
+    ],
+    'search_results': [
+        (By.XPATH, "//div[contains(@class, 'Search_widgetsV2__27BBR')]"),
+        (By.XPATH, "//div[contains(@class, 'Search_widgetsV2')]"),
+    ],
+    'first_restaurant_card': [
+        (By.XPATH, "//div[contains(@class, 'Search_widgetsV2__27BBR')]//a[@data-testid='resturant-card-anchor-container'][1]"),
+        (By.XPATH, "(//a[@data-testid='resturant-card-anchor-container'])[1]"),
+    ],
+    'menu_search_button': [
+        (By.XPATH, "//button[.//div[text()='Search for dishes']]"),
+        (By.XPATH, "//button[contains(normalize-space(), 'Search for dishes')]"),
+    ],
+    'menu_search_input': [
+        (By.XPATH, "//input[@data-cy='menu-search-header']"),
+    ],
+    'dish_item': [
+        (By.XPATH, "//div[@data-testid='normal-dish-item']"),
+    ],
+    'dish_minus_button': [
+        (By.XPATH, ".//button[contains(@class, 'add-button-left-container')]//div[text()='−']"),
+    ],
+    'dish_add_button': [
+        (By.XPATH, ".//button[contains(@class, 'add-button-center-container')]"),
+        (By.XPATH, ".//button[normalize-space()='ADD']"),
+    ],
+    'dish_plus_button': [
+        (By.XPATH, ".//button[contains(@class, 'add-button-right-container')]"),
+    ],
+    'customize_continue': [
+        (By.XPATH, "//button[@data-testid='menu-customize-continue-button']"),
+    ],
+    'start_afresh': [
+        (By.XPATH, "//button[contains(@class, 'hoJL8') and text()='Yes, start afresh']"),
+        (By.XPATH, "//button[normalize-space()='Yes, start afresh']"),
+    ],
+    'customize_add_to_cart': [
+        (By.XPATH, "//button[@data-cy='customize-footer-add-button']"),
+    ],
+    'customization_modal': [
+        (By.XPATH, "//div[contains(@class, 'styles_container__')]"),
+    ],
+    'modal_add_item': [
+        (By.XPATH, "//button[normalize-space()='Add Item']"),
+    ],
+    'view_cart': [
+        (By.XPATH, "//button[@id='view-cart-btn']"),
+        (By.XPATH, "//button[normalize-space()='View Cart']"),
+    ],
+    'checkout_address': [
+        (By.XPATH, "//div[@class='PPJbN' and text()='{address}']/ancestor::div[@class='_3FahR']"),
+        (By.XPATH, "//div[normalize-space()='{address}']/parent::div"),
+    ],
+    'cart_total': [
+        (By.XPATH, "//div[normalize-space()='Item Total']/following-sibling::div[1]"),
+        (By.XPATH, "//div[normalize-space()='TO PAY']/following-sibling::div[1]"),
+    ],
+    'apply_coupon': [
+        (By.XPATH, "//div[@role='button' and @aria-label='Apply Coupon']"),
+        (By.XPATH, "//*[@role='button' and normalize-space()='Apply Coupon']"),
+    ],
+    'coupon_popup': [
+        (By.XPATH, "//div[contains(@class, '_2qrkp')]"),
+        (By.XPATH, "//h2[text()='Available Coupons']/parent::div"),
+    ],
+    'coupon_input': [
+        (By.XPATH, "//input[@placeholder='Enter coupon code']"),
+    ],
+    'coupon_apply': [
+        (By.XPATH, "//a[text()='APPLY']"),
+        (By.XPATH, "//input[@placeholder='Enter coupon code']/following-sibling::a[1]"),
+    ],
+    'coupon_popup_close': [
+        (By.XPATH, "//span[contains(@class, '_1X6No')]"),
+    ],
+    'coupon_yay': [
+        (By.XPATH, "//button[contains(@class, '_1vTiX') and text()='YAY!']"),
+        (By.XPATH, "//button[normalize-space()='YAY!']"),
+    ],
+    'proceed_to_pay': [
+        (By.XPATH, "//button[contains(@class, '_4dnMB') and text()='Proceed to Pay']"),
+        (By.XPATH, "//button[normalize-space()='Proceed to Pay']"),
+    ],
+    'swiggy_money': [
+        (By.XPATH, "//div[@data-testid='pm_si_container' and .//div[contains(text(), 'Swiggy Money')]]"),
+    ],
+    'pay_button': [
+        (By.XPATH, "//button[@data-testid='pm_si_pay_btn' and contains(text(), 'Pay')]"),
+    ],
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_stats = None
+_pending = {}
+_last_persist = 0.0
+
+
+def _load():
+    global _stats
+    if _stats is None:
+        _stats = file_store.read_json(STATS_PATH)
+        logger.info(f"Loaded selector statistics for {len(_stats)} selector(s).")
+    return _stats
+
+
+def _selector_stats(stats, name):
+    return stats.setdefault(name, {'timeouts': 0, 'candidates': {}})
+
+
+def _add_counts(selector, template, hits=0, misses=0, seconds=0.0):
+    candidate = selector['candidates'].setdefault(template, {'hits': 0, 'misses': 0, 'seconds': 0.0})
+    candidate['hits'] += hits
+    candidate['misses'] += misses
+    candidate['seconds'] += seconds
+
+
+def _merge(changes):
+    def merge(stats):
+        for name, change in changes.items():
+            selector = _selector_stats(stats, name)
+            selector['timeouts'] = change['timeouts'] if change['reset'] else selector['timeouts'] + change['timeouts']
+            for template, counts in change['candidates'].items():
+                _add_counts(selector, template, **counts)
+    return merge
+
+
+def _persist(force=False):
+    # Every worker counts into the same file, so write only what changed here since the last write
+    # and merge it into what is on disk instead of overwriting the file with this process's copy.
+    global _stats, _pending, _last_persist
+    if not _pending or (not force and time.time() - _last_persist < STATS_PERSIST_INTERVAL):
+        return
+    _last_persist = time.time()
+    changes, _pending = _pending, {}
+    try:
+        _stats, _ = file_store.update_json(STATS_PATH, _merge(changes))
+    except OSError as e:
+        logger.warning(f"Could not write selector statistics to {STATS_PATH}: {e}")
+        _pending = changes
+
+
+def _change(name):
+    return _pending.setdefault(name, {'reset': False, 'timeouts': 0, 'candidates': {}})
+
+
+def _count(name, template, **counts):
+    _add_counts(_selector_stats(_load(), name), template, **counts)
+    _add_counts(_change(name), template, **counts)
+
+
+def _count_timeout(name, timed_out):
+    change = _change(name)
+    selector = _selector_stats(_load(), name)
+    if timed_out:
+        selector['timeouts'] += 1
+        change['timeouts'] += 1
+    else:
+        selector['timeouts'] = 0
+        change.update(reset=True, timeouts=0)
+
+
+def _ordered(name):
+    candidates = SELECTORS[name]
+    with _lock:
+        stats = _load().get(name, {}).get('candidates', {})
+
+        def rank(position):
+            candidate = stats.get(candidates[position][1], {'hits': 0, 'misses': 0, 'seconds': 0.0})
+            average = candidate['seconds'] / candidate['hits'] if candidate['hits'] else math.inf
+            return candidate['misses'] > candidate['hits'], average, position
+
+        return sorted(range(len(candidates)), key=rank)
+
+
+def locators(name, **params):
+    return [(SELECTORS[name][position][0], SELECTORS[name][position][1].format(**params)) for position in _ordered(name)]
+
+
+def _record(name, hit_position, missed_positions, seconds):
+    candidates = SELECTORS[name]
+    with _lock:
+        for position in missed_positions:
+            _count(name, candidates[position][1], misses=1)
+        if hit_position is not None:
+            _count(name, candidates[hit_position][1], hits=1, seconds=seconds)
+        _count_timeout(name, hit_position is None)
+        _persist()
+    for position in missed_positions:
+        metrics.increment('swiggy_selector_lookups_total', selector=name, candidate=str(position), result='miss')
+    if hit_position is not None:
+        metrics.increment('swiggy_selector_lookups_total', selector=name, candidate=str(hit_position), result='hit')
+        if hit_position != 0:
+            logger.warning(f"Selector '{name}' matched only with fallback candidate {hit_position}.")
+
+
+def candidates(name, **params):
+    order = _ordered(name)
+    return order, [[SELECTORS[name][position][0], SELECTORS[name][position][1].format(**params)] for position in order]
+
+
+def record_match(name, order, index, seconds):
+    if index is None:
+        _record(name, None, order, seconds)
+    else:
+        _record(name, order[index], order[:index], seconds)
+
+
+def effective_timeout(name, timeout, required=True):
+    if required and is_broken(name):
+        logger.warning(f"Selector '{name}' timed out on its last {BROKEN_AFTER} lookups. Waiting only {BROKEN_TIMEOUT}s.")
+        return min(timeout, BROKEN_TIMEOUT)
+    return timeout
+
+
+def is_broken(name):
+    with _lock:
+        return _load().get(name, {}).get('timeouts', 0) >= BROKEN_AFTER
+
+
+def wait(driver, name, condition, timeout, required=True, **params):
+    order, locators = candidates(name, **params)
+    ordered_locators = [tuple(locator) for locator in locators]
+    timeout = effective_timeout(name, timeout, required)
+
+    def any_candidate(driver):
+        for index, locator in enumerate(ordered_locators):
+            try:
+                result = condition(locator)(driver)
+            except (NoSuchElementException, StaleElementReferenceException):
+                result = False
+            if result:
+                return index, result
+        return False
+
+    started = time.monotonic()
+    try:
+        index, element = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(any_candidate)
+    except TimeoutException:
+        if required:
+            record_match(name, order, None, time.monotonic() - started)
+            metrics.record_failure(name)
+        raise
+    record_match(name, order, index, time.monotonic() - started)
+    return element
+
+
+def find(context, name, **params):
+    order = _ordered(name)
+    for index, position in enumerate(order):
+        by, template = SELECTORS[name][position]
+        try:
+            element = context.find_element(by, template.format(**params))
+        except NoSuchElementException:
+            continue
+        _record(name, position, order[:index], 0.0)
+        return element
+    raise NoSuchElementException(f"No candidate of selector '{name}' matched.")
+
+
+def detect(driver, names, **params):
+    orders = {}
+    selectors = []
+    for name in names:
+        orders[name], locators = candidates(name, **params)
+        selectors.append([name, locators])
+    found = driver.execute_script(DETECT_SCRIPT, selectors)
+    if not found:
+        return None
+    name, index, element = found
+    record_match(name, orders[name], index, 0.0)
+    return name, element
+
+
+def find_all(context, name, **params):
+    for by, value in locators(name, **params):
+        elements = context.find_elements(by, value)
+        if elements:
+            return elements
+    return []
+
+
+def flush():
+    with _lock:
+        _persist(force=True)
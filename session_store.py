@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import file_store
+
+SESSION_PATH = os.path.join(os.getcwd(), 'login_cookies.json')
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+LOCAL_STORAGE_SCRIPT = """
+(function(origin, items, overwrite) {
+    if (location.origin !== origin) {
+        return;
+    }
+    for (var key in items) {
+        try {
+            if (overwrite || localStorage.getItem(key) === null) {
+                localStorage.setItem(key, items[key]);
+            }
+        } catch (e) {
+            return;
+        }
+    }
+})(%s, %s, %s);
+"""
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_session = None
+_modified_at = None
+_drivers = {}
+
+
+def _load():
+    # Another worker may have logged in again since we last looked, so follow the file on disk.
+    global _session, _modified_at
+    modified_at = file_store.modified_at(SESSION_PATH)
+    if _session is not None and modified_at == _modified_at:
+        return _session
+    _session = file_store.read_json(SESSION_PATH)
+    _modified_at = modified_at
+    if _session.get('cookies'):
+        logger.info(f"Loaded saved session {_session.get('generation', 0)} with {len(_session['cookies'])} cookie(s).")
+    return _session
+
+
+def generation():
+    with _lock:
+        return _load().get('generation', 0)
+
+
+def _cookie_params(cookies):
+    now = time.time()
+    params = []
+    for cookie in cookies:
+        if not cookie.get('session') and 0 < cookie.get('expires', -1) < now:
+            continue
+        param = {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+        if cookie.get('session') or param.get('expires', -1) <= 0:
+            param.pop('expires', None)
+        params.append(param)
+    return params
+
+
+def _storage_script(origin, local_storage, overwrite):
+    return LOCAL_STORAGE_SCRIPT % (json.dumps(origin), json.dumps(local_storage), json.dumps(overwrite))
+
+
+def capture(driver, origin):
+    global _session, _modified_at
+    cookies = driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+    local_storage = driver.execute_script("return Object.assign({}, window.localStorage);")
+
+    def save(session):
+        # Number the session after the newest one on disk, which another worker may have written.
+        session.update(
+            generation=session.get('generation', 0) + 1,
+            origin=origin,
+            saved_at=time.time(),
+            cookies=cookies,
+            local_storage=local_storage,
+        )
+
+    with _lock:
+        session, _modified_at = file_store.update_json(SESSION_PATH, save)
+        _session = session
+        script_id = _drivers.get(id(driver), {}).get('script_id')
+        _drivers[id(driver)] = {'generation': session['generation'], 'script_id': script_id}
+    logger.info(f"Saved session {session['generation']} with {len(cookies)} cookie(s) "
+                f"and {len(local_storage)} localStorage key(s).")
+    return session['generation']
+
+
+def rehydrate(driver, overwrite=False, new_driver=False):
+    with _lock:
+        session = dict(_load())
+        previous = None if new_driver else _drivers.get(id(driver))
+    if not session.get('cookies'):
+        logger.info("No saved session to inject.")
+        with _lock:
+            _drivers[id(driver)] = {'generation': session.get('generation', 0), 'script_id': None}
+        return False
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setCookies', {'cookies': _cookie_params(session['cookies'])})
+    if previous and previous['script_id']:
+        driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': previous['script_id']})
+    script_id = driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': _storage_script(session['origin'], session['local_storage'], False)
+    })['identifier']
+    if overwrite:
+        driver.execute_script(_storage_script(session['origin'], session['local_storage'], True))
+    with _lock:
+        _drivers[id(driver)] = {'generation': session['generation'], 'script_id': script_id}
+    logger.info(f"Injected session {session['generation']} into driver {id(driver)}.")
+    return True
+
+
+def relogin(driver, origin, login):
+    with _lock:
+        seen = _drivers.get(id(driver), {}).get('generation', 0)
+    # The lock is a file so that only one worker process asks for an OTP; the others wait and reuse its session.
+    with file_store.locked(f"{SESSION_PATH}.login"):
+        if generation() > seen:
+            logger.info("Another browser has already logged in again. Reusing its session.")
+            rehydrate(driver, overwrite=True)
+            driver.refresh()
+            return True
+        logger.info("Session expired. Logging in again for every browser and worker.")
+        if not login(driver):
+            return False
+        capture(driver, origin)
+        return True
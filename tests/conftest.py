@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api
+import jobs
+import cart_lock
+import dish_index
+import order_checkpoints
+import unresolved_cache
+import availability_cache
+
+CATALOGUE = {
+    'Little Italy': ['Margherita Pizza', 'Pasta Carbonara'],
+    'Chung Wah': ['Spring Rolls'],
+    'Pizza Hut': ['Margherita Pizza'],
+}
+JOB_ID = 'a' * 32
+
+
+@pytest.fixture
+def stage_calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(order_checkpoints, 'ORDER_CHECKPOINTS_DIR', str(tmp_path / 'order_checkpoints'))
+    monkeypatch.setattr(jobs, 'JOBS_DIR', str(tmp_path / 'order_jobs'))
+    monkeypatch.setattr(cart_lock, 'CART_LOCK_PATH', str(tmp_path / 'swiggy_cart'))
+    monkeypatch.setattr(api, 'catalogue_index', dish_index.build_dish_index(CATALOGUE))
+    monkeypatch.setattr(api, 'ensure_session', lambda driver: True)
+    monkeypatch.setattr(api, 'prefetch_menu', lambda driver, restaurant_name: None)
+    monkeypatch.setattr(api.waits, 'settle_dom', lambda driver: None)
+    monkeypatch.setattr(api, 'STAGE_RETRY_BACKOFF', 0)
+    unresolved_cache.clear()
+    availability_cache.clear()
+    calls = []
+
+    def record(stage):
+        def action(driver, order):
+            calls.append((order['restaurant_name'], stage))
+        return action
+
+    monkeypatch.setattr(api, 'ORDER_STAGE_ACTIONS', {stage: record(stage) for stage in api.ORDER_STAGES})
+    jobs._current.job_id = JOB_ID
+    yield calls
+    jobs._current.job_id = None
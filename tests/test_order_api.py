@@ -0,0 +1,41 @@
+import pytest
+
+import api
+import jobs
+
+
+@pytest.fixture
+def client(stage_calls, monkeypatch):
+    monkeypatch.setattr(jobs, 'submit_job', lambda payload, callback_url=None: 'd' * 32)
+    return api.app.test_client()
+
+
+@pytest.mark.parametrize('body', [['items'], 'dish', 5])
+def test_non_object_body_is_rejected(client, body):
+    response = client.post('/order', json=body)
+    assert response.status_code == 400
+
+
+def test_merged_quantity_above_the_limit_is_rejected(client):
+    items = [{'dish': 'Margherita Pizza', 'quantity': 10}, {'dish': 'margherita pizza', 'quantity': 10}]
+    response = client.post('/order', json={'items': items})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('callback_url, status', [(5, 400), ('ftp://example.com', 400), ('https://example.com', 202), (None, 202)])
+def test_callback_url_is_validated(client, callback_url, status):
+    response = client.post('/order', json={'dish': 'Spring Rolls', 'callback_url': callback_url})
+    assert response.status_code == status
+
+
+def test_unknown_dish_is_rejected_with_suggestions(client):
+    response = client.post('/order', json={'dish': 'Spring Roll'})
+    assert response.status_code == 202
+    response = client.post('/order', json={'dish': 'Pasta Alfredo'})
+    assert response.status_code == 404
+    assert response.get_json()['unknown_dishes'][0]['dish'] == 'Pasta Alfredo'
+
+
+def test_update_stage_rejects_unknown_stage():
+    with pytest.raises(ValueError):
+        jobs.update_stage('in_basket')
@@ -0,0 +1,125 @@
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+
+import api
+import jobs
+import cart_lock
+import availability_cache
+import order_checkpoints
+from conftest import JOB_ID
+
+ITEMS = [{'dish': 'Margherita Pizza', 'quantity': 1}, {'dish': 'Spring Rolls', 'quantity': 2}]
+CHECKOUT_STAGES = ['address_selected', 'coupon_applied', 'payment_page', 'placed']
+
+
+def stages_of(calls, restaurant_name):
+    return [stage for name, stage in calls if name == restaurant_name]
+
+
+@pytest.mark.parametrize('stage, expected', [
+    (None, list(api.ORDER_STAGES)),
+    ('restaurant_page', list(api.ORDER_STAGES)),
+    ('in_cart', CHECKOUT_STAGES),
+    ('address_selected', CHECKOUT_STAGES),
+    ('coupon_applied', ['address_selected', 'payment_page', 'placed']),
+    ('payment_page', ['address_selected', 'payment_page', 'placed']),
+])
+def test_stages_to_run(stage, expected):
+    assert api.stages_to_run(stage) == expected
+
+
+def test_place_order_runs_every_stage_per_restaurant(stage_calls):
+    checkpoint = api.new_checkpoint(ITEMS)
+    api.place_order(None, checkpoint)
+    assert stages_of(stage_calls, 'Little Italy') == list(api.ORDER_STAGES)
+    assert stages_of(stage_calls, 'Chung Wah') == list(api.ORDER_STAGES)
+    assert checkpoint['placed'] == ['Little Italy', 'Chung Wah']
+    assert checkpoint['pending'] == {}
+    assert order_checkpoints.get_checkpoint(JOB_ID)['placed'] == ['Little Italy', 'Chung Wah']
+
+
+def test_empty_pending_is_already_placed(stage_calls):
+    checkpoint = api.new_checkpoint(ITEMS)
+    checkpoint.update(pending={}, placed=['Little Italy', 'Chung Wah'])
+    api.place_order(None, checkpoint)
+    assert stage_calls == []
+
+
+def test_resume_skips_placed_restaurants(stage_calls):
+    checkpoint = api.new_checkpoint(ITEMS)
+    del checkpoint['pending']['Little Italy']
+    checkpoint['placed'] = ['Little Italy']
+    api.place_order(None, checkpoint)
+    assert stage_calls == [('Chung Wah', stage) for stage in api.ORDER_STAGES]
+    assert checkpoint['placed'] == ['Little Italy', 'Chung Wah']
+
+
+def test_resume_after_cart_goes_to_checkout(stage_calls):
+    with cart_lock.holding_cart(JOB_ID):
+        pass
+    checkpoint = api.new_checkpoint(ITEMS[:1])
+    checkpoint.update(restaurant='Little Italy', stage='in_cart')
+    api.place_order(None, checkpoint)
+    assert stages_of(stage_calls, 'Little Italy') == CHECKOUT_STAGES
+
+
+def test_resume_refills_cart_used_by_another_order(stage_calls):
+    with cart_lock.holding_cart('b' * 32):
+        pass
+    checkpoint = api.new_checkpoint(ITEMS[:1])
+    checkpoint.update(restaurant='Little Italy', stage='coupon_applied')
+    api.place_order(None, checkpoint)
+    assert stages_of(stage_calls, 'Little Italy') == ['restaurant_page', 'in_cart', 'address_selected', 'payment_page', 'placed']
+
+
+def test_transient_error_retries_the_stage(stage_calls, monkeypatch):
+    failures = [StaleElementReferenceException('stale')]
+
+    def fill_cart(driver, order):
+        stage_calls.append((order['restaurant_name'], 'in_cart'))
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setitem(api.ORDER_STAGE_ACTIONS, 'in_cart', fill_cart)
+    api.place_order(None, api.new_checkpoint(ITEMS[:1]))
+    assert stages_of(stage_calls, 'Little Italy').count('in_cart') == 2
+
+
+def test_pay_stage_is_never_retried(stage_calls, monkeypatch):
+    def pay(driver, order):
+        stage_calls.append((order['restaurant_name'], 'placed'))
+        raise StaleElementReferenceException('stale')
+
+    monkeypatch.setitem(api.ORDER_STAGE_ACTIONS, 'placed', pay)
+    checkpoint = api.new_checkpoint(ITEMS[:1])
+    with pytest.raises(StaleElementReferenceException):
+        api.place_order(None, checkpoint)
+    assert stages_of(stage_calls, 'Little Italy').count('placed') == 1
+    assert order_checkpoints.get_checkpoint(JOB_ID)['stage'] == 'payment_page'
+
+
+def test_unavailable_restaurant_falls_back(stage_calls, monkeypatch):
+    def open_restaurant(driver, order):
+        stage_calls.append((order['restaurant_name'], 'restaurant_page'))
+        if order['restaurant_name'] == 'Little Italy':
+            availability_cache.mark_unavailable('Little Italy')
+            raise Exception("Restaurant 'Little Italy' is unavailable right now.")
+
+    monkeypatch.setitem(api.ORDER_STAGE_ACTIONS, 'restaurant_page', open_restaurant)
+    checkpoint = api.new_checkpoint(ITEMS[:1])
+    api.place_order(None, checkpoint)
+    assert stages_of(stage_calls, 'Little Italy') == ['restaurant_page']
+    assert stages_of(stage_calls, 'Pizza Hut') == list(api.ORDER_STAGES)
+    assert checkpoint['placed'] == ['Pizza Hut']
+
+
+def test_drain_keeps_the_checkpoint_of_a_resumed_job(stage_calls, monkeypatch):
+    checkpoint = api.new_checkpoint(ITEMS)
+    del checkpoint['pending']['Little Italy']
+    checkpoint['placed'] = ['Little Italy']
+    order_checkpoints.save_checkpoint(JOB_ID, checkpoint)
+    new_job_id = 'c' * 32
+    monkeypatch.setattr(jobs, 'stop_workers', lambda timeout: [(JOB_ID, {'items': ITEMS}), (new_job_id, {'items': ITEMS})])
+    api._save_unstarted_jobs(0)
+    assert order_checkpoints.get_checkpoint(JOB_ID) == checkpoint
+    assert list(order_checkpoints.get_checkpoint(new_job_id)['pending']) == ['Little Italy', 'Chung Wah']
@@ -0,0 +1,34 @@
+import time
+import logging
+import threading
+
+import dish_index
+
+UNRESOLVED_TTL = 10 * 60
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_queries = {}
+
+
+def get_suggestions(query):
+    key = dish_index.normalise(query)
+    with _lock:
+        entry = _queries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['saved_at'] > UNRESOLVED_TTL:
+            del _queries[key]
+            return None
+        return list(entry['suggestions'])
+
+
+def save_suggestions(query, suggestions):
+    with _lock:
+        _queries[dish_index.normalise(query)] = {'suggestions': list(suggestions), 'saved_at': time.time()}
+
+
+def clear():
+    with _lock:
+        _queries.clear()
@@ -0,0 +1,115 @@
+import os
+import time
+import logging
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+WAIT_MODE = os.environ.get('SWIGGY_WAIT_MODE', 'event')
+SETTLE_TIMEOUT = 5
+POLL_FREQUENCY = 0.1
+NETWORK_IDLE_MS = 300
+DOM_QUIET_MS = 200
+
+logger = logging.getLogger(__name__)
+
+_STATE_SCRIPT = """
+if (!window.__swiggyWaits) {
+    var state = window.__swiggyWaits = {pending: 0, lastNetwork: performance.now(), lastMutation: performance.now()};
+    var markNetwork = function() { state.lastNetwork = performance.now(); };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function() {
+            state.pending++;
+            markNetwork();
+            return originalFetch.apply(this, arguments).finally(function() {
+                state.pending--;
+                markNetwork();
+            });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        state.pending++;
+        markNetwork();
+        this.addEventListener('loadend', function() {
+            state.pending--;
+            markNetwork();
+        });
+        return originalSend.apply(this, arguments);
+    };
+    new MutationObserver(function() { state.lastMutation = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+var state = window.__swiggyWaits;
+var resources = performance.getEntriesByType('resource');
+var lastResource = resources.length ? resources[resources.length - 1].responseEnd : 0;
+var now = performance.now();
+return {
+    ready: document.readyState,
+    pending: state.pending,
+    sinceNetwork: now - Math.max(state.lastNetwork, lastResource),
+    sinceMutation: now - state.lastMutation
+};
+"""
+
+
+def element_stable(element):
+    last_rect = [None]
+
+    def _predicate(driver):
+        rect = element.rect
+        stable = rect == last_rect[0]
+        last_rect[0] = rect
+        return stable
+
+    return _predicate
+
+
+def network_idle(idle_ms=NETWORK_IDLE_MS):
+    def _predicate(driver):
+        state = driver.execute_script(_STATE_SCRIPT)
+        return state['ready'] == 'complete' and state['pending'] <= 0 and state['sinceNetwork'] >= idle_ms
+
+    return _predicate
+
+
+def dom_settled(quiet_ms=DOM_QUIET_MS):
+    def _predicate(driver):
+        state = driver.execute_script(_STATE_SCRIPT)
+        return state['sinceMutation'] >= quiet_ms
+
+    return _predicate
+
+
+def page_settled(idle_ms=NETWORK_IDLE_MS, quiet_ms=DOM_QUIET_MS):
+    def _predicate(driver):
+        state = driver.execute_script(_STATE_SCRIPT)
+        return (state['ready'] == 'complete' and state['pending'] <= 0
+                and state['sinceNetwork'] >= idle_ms and state['sinceMutation'] >= quiet_ms)
+
+    return _predicate
+
+
+def _wait(driver, condition, fallback, label):
+    if WAIT_MODE == 'sleep':
+        time.sleep(fallback)
+        return
+    started = time.monotonic()
+    try:
+        WebDriverWait(driver, SETTLE_TIMEOUT, poll_frequency=POLL_FREQUENCY).until(condition)
+        logger.debug(f"{label} after {time.monotonic() - started:.2f}s.")
+    except WebDriverException:
+        logger.debug(f"Gave up waiting for {label.lower()} after {time.monotonic() - started:.2f}s.")
+
+
+def settle_after_scroll(driver, element, fallback=0.5):
+    _wait(driver, element_stable(element), fallback, "Element stable")
+
+
+def settle_dom(driver, fallback=0.5):
+    _wait(driver, dom_settled(), fallback, "DOM settled")
+
+
+def settle_page(driver, fallback=1):
+    _wait(driver, page_settled(), fallback, "Page settled")